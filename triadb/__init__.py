@@ -33,7 +33,8 @@ __status__ = 'Beta'
 
 from .mis import MIS
 from .utils import ETL, display_dataframes
-from .clients import ConnectionPool
+from .clients import ConnectionPool, AsyncClickHouse
 from .connectors import MetaManagementConnector, DataManagementConnector
+from .sessions import SessionManager
 from .subsystems import DataModelSystem, DataResourceSystem
 from .meta_models import Node, DataModel, Entity, Attribute
\ No newline at end of file
@@ -0,0 +1,14 @@
+"""
+This file is part of TRIADB Self-Service Data Management and Analytics Framework
+(C) 2015-2019 Athanassios I. Hatzis
+
+TRIADB is free software: you can redistribute it and/or modify it under the terms of
+the GNU Affero General Public License v.3.0 as published by the Free Software Foundation.
+
+TRIADB is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with TRIADB.
+If not, see <https://www.gnu.org/licenses/>.
+"""
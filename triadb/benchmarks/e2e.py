@@ -0,0 +1,189 @@
+"""
+This file is part of TRIADB Self-Service Data Management and Analytics Framework
+(C) 2015-2019 Athanassios I. Hatzis
+
+TRIADB is free software: you can redistribute it and/or modify it under the terms of
+the GNU Affero General Public License v.3.0 as published by the Free Software Foundation.
+
+TRIADB is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with TRIADB.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# End-to-end benchmark suite of TRIADB on the SPC and Northwind test cases
+#
+# The data models and the data sets of the test cases must have been added to the metastore and mapped,
+# see test_cases/SPC/SPC_MYSQL_mapping_loading.py. Each case is repeated, its median and p95 are reported
+# and all the timings are written to a JSON file. Connection parameters point to any ClickHouse and MariaDB
+# servers, e.g. a local installation or containers that stand in for the production servers.
+#
+# Usage: python -m triadb.benchmarks.e2e [--testcase SPC Northwind] [--repeat 10] [--load] [--output e2e.json]
+
+import sys
+import json
+import time
+import argparse
+import platform
+from statistics import median
+
+from triadb import MIS
+
+# Test cases: dimensions of the data model and the data set, selections, attributes of get_items and get_tuples
+# A selection is either an expression of `Where` or (csv list of values, `In=True`)
+TESTCASES = {
+    'SPC': {
+        'model': 200, 'dataset': 242,
+        'single': [('c_price', '$v<20')],
+        'multiple': [('c_price', '$v<20'), ('c_quantity', '$v=200')],
+        'items': 'c_price',
+        'tuples': ('CAT', ['c_price', 'c_quantity', 'c_date', 'c_check'])
+    },
+    'Northwind': {
+        'model': 500, 'dataset': 363,
+        'single': [('c_country', ('Brazil, Mexico, Argentina', True))],
+        'multiple': [('o_country', ('Brazil, Mexico, Argentina', True)), ('o_freight', '$v>50')],
+        'items': 'odet_quantity',
+        'tuples': ('Odet', ['odet_price', 'odet_quantity', 'odet_discount'])
+    }
+}
+
+
+def percentile(values, pct):
+    """
+    :param values: list of numbers
+    :param pct: percentile in the range 0-100
+    :return: nearest-rank percentile of the values
+    """
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def measure(func, setup=None, repeat=10, warmup=1):
+    """
+    :param func: callable of the case, only this call is timed
+    :param setup: callable that runs before each call of func, e.g. to reset filter states
+    :param repeat: number of timed runs
+    :param warmup: number of runs that are not timed
+    :return: list of elapsed times in seconds
+    """
+    timings = []
+    for run in range(warmup + repeat):
+        if setup:
+            setup()
+        t_start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - t_start
+        if run >= warmup:
+            timings.append(elapsed)
+    return timings
+
+
+def summary(testcase, case, timings):
+    return {'testcase': testcase, 'case': case, 'repeat': len(timings),
+            'median': round(median(timings), 6), 'p95': round(percentile(timings, 95), 6),
+            'min': round(min(timings), 6), 'max': round(max(timings), 6),
+            'timings': [round(t, 6) for t in timings]}
+
+
+def connect(args):
+    mis = MIS(debug=0)
+    mis.connect_to_metastore(dbms='mariadb', host=args.mariadb_host, port=args.mariadb_port,
+                             user=args.user, password=args.password, database=args.metadb, trace=0)
+    mis.connect_to_datastore(dbms='clickhouse', host=args.clickhouse_host, port=args.clickhouse_port,
+                             user=args.user, password=args.password, database=args.datadb, trace=0)
+    return mis
+
+
+def selection(eng, alias, expr):
+    hacol = eng.set_hacol(alias=alias)
+    if isinstance(expr, tuple):
+        return hacol.cql.Select().Where('$v').In(expr[0], csvtype='string')
+    return hacol.cql.Select().Where(expr)
+
+
+def run_testcase(mis, name, spec, repeat=10, warmup=1, load=False):
+    """
+    :param mis: MIS object connected to the metastore and the datastore
+    :param name: name of the test case, see TESTCASES
+    :param spec: specification of the test case
+    :param repeat: number of timed runs of each case
+    :param warmup: number of runs of each case that are not timed
+    :param load: also run import_data and load_data, they rebuild the tables of the data set
+    :return: list of case summaries
+    """
+    results = []
+    mis.restart(spec['model'], spec['dataset'])
+
+    def bench(case, func, setup=None, runs=repeat, warm=warmup):
+        results.append(summary(name, case, measure(func, setup=setup, repeat=runs, warmup=warm)))
+        print(f'{name:<10} {case:<18} median {results[-1]["median"]:>9.4f} sec   p95 {results[-1]["p95"]:>9.4f} sec')
+
+    if load:
+        # Importing and loading take long, they run without warmup and with fewer repetitions
+        load_runs = max(1, repeat // 5)
+        bench('import_data', lambda: mis.import_data(), runs=load_runs, warm=0)
+        bench('load_data', lambda: mis.load_data(), runs=load_runs, warm=0)
+
+    bench('restart', lambda: mis.restart(spec['model'], spec['dataset'], reset=True))
+    eng = mis.restart(spec['model'], spec['dataset'], reset=True)
+
+    bench('filter_single',
+          lambda: eng.filter_selections([selection(eng, alias, expr) for alias, expr in spec['single']]),
+          setup=eng.restart)
+    bench('filter_multiple',
+          lambda: eng.filter_selections([selection(eng, alias, expr) for alias, expr in spec['multiple']],
+                                        mode='multiple'),
+          setup=eng.restart)
+
+    # Reads run on the filtered state of the single selections
+    eng.restart()
+    eng.filter_selections([selection(eng, alias, expr) for alias, expr in spec['single']])
+    bench('get_items', lambda: mis.get_items(alias=spec['items'], highlight=False))
+    aset_alias, attr_aliases = spec['tuples']
+    aset_dim2 = eng.get_aset(alias=aset_alias).key[1]
+    dims = [eng.set_hacol(alias=alias).dim2 for alias in attr_aliases]
+    bench('get_tuples', lambda: mis.get_tuples(*dims, aset_dim2=aset_dim2, limit=1000))
+    bench('count_items', lambda: mis.count_items())
+
+    eng.restart()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='End-to-end benchmark suite of TRIADB')
+    parser.add_argument('--testcase', nargs='+', choices=sorted(TESTCASES), default=sorted(TESTCASES))
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--load', action='store_true', help='also benchmark import_data and load_data')
+    parser.add_argument('--output', default='e2e_results.json', help='JSON file with the results')
+    parser.add_argument('--clickhouse-host', default='localhost')
+    parser.add_argument('--clickhouse-port', type=int, default=9000)
+    parser.add_argument('--mariadb-host', default='localhost')
+    parser.add_argument('--mariadb-port', type=int, default=3306)
+    parser.add_argument('--user', default='demo')
+    parser.add_argument('--password', default='demo')
+    parser.add_argument('--metadb', default='TRIADB')
+    parser.add_argument('--datadb', default='TriaDB')
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.testcase:
+        mis = connect(args)
+        results += run_testcase(mis, name, TESTCASES[name], repeat=args.repeat, warmup=args.warmup, load=args.load)
+
+    report = {'python': platform.python_version(), 'platform': platform.platform(),
+              'clickhouse': f'{args.clickhouse_host}:{args.clickhouse_port}',
+              'mariadb': f'{args.mariadb_host}:{args.mariadb_port}',
+              'repeat': args.repeat, 'warmup': args.warmup, 'cases': results}
+    with open(args.output, 'w') as fp:
+        json.dump(report, fp, indent=2)
+    print(f'Results are written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+This file is part of TRIADB Self-Service Data Management and Analytics Framework
+(C) 2015-2019 Athanassios I. Hatzis
+
+TRIADB is free software: you can redistribute it and/or modify it under the terms of
+the GNU Affero General Public License v.3.0 as published by the Free Software Foundation.
+
+TRIADB is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with TRIADB.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Import-time benchmark of TRIADB
+#
+# Each run starts a fresh Python interpreter that imports triadb and creates an MIS object,
+# the best run is compared with the time budgets and the optional packages that have been loaded are reported.
+#
+# Usage: python -m triadb.benchmarks.import_time [--runs 5] [--import-budget 1.5] [--mis-budget 0.1]
+
+import sys
+import json
+import argparse
+import subprocess
+
+# Time budgets in seconds
+IMPORT_BUDGET = 1.5
+MIS_BUDGET = 0.1
+
+# Packages that must not be loaded by `import triadb`, they are imported on first use
+LAZY_MODULES = ['matplotlib', 'pydot', 'graphviz', 'tkinter', 'IPython', 'petl', 'psutil']
+
+_PROBE = '''
+import sys, json, time
+t_start = time.perf_counter()
+import triadb
+t_import = time.perf_counter()
+triadb.MIS()
+t_mis = time.perf_counter()
+print(json.dumps({'import': t_import - t_start, 'mis': t_mis - t_import,
+                  'loaded': [name for name in %r if name in sys.modules]}))
+'''
+
+
+def probe(python=sys.executable):
+    """
+    :param python: Python interpreter that runs the probe
+    :return: dictionary with the import time of triadb, the start-up time of MIS and the lazy modules loaded
+    """
+    out = subprocess.run([python, '-c', _PROBE % LAZY_MODULES], check=True, stdout=subprocess.PIPE)
+    return json.loads(out.stdout.decode().strip().splitlines()[-1])
+
+
+def run(runs=5, import_budget=IMPORT_BUDGET, mis_budget=MIS_BUDGET):
+    """
+    :param runs: number of fresh interpreters, the best time of all runs is reported
+    :param import_budget: maximum seconds for `import triadb`
+    :param mis_budget: maximum seconds for `MIS()`
+    :return: dictionary with the best times, the lazy modules loaded and whether the budgets are met
+    """
+    results = [probe() for _ in range(runs)]
+    result = {'import': round(min(res['import'] for res in results), 3),
+              'mis': round(min(res['mis'] for res in results), 3),
+              'loaded': sorted(set(name for res in results for name in res['loaded']))}
+    result['passed'] = (result['import'] <= import_budget and result['mis'] <= mis_budget
+                        and not result['loaded'])
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import-time benchmark of TRIADB')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET)
+    parser.add_argument('--mis-budget', type=float, default=MIS_BUDGET)
+    args = parser.parse_args(argv)
+
+    result = run(args.runs, args.import_budget, args.mis_budget)
+    print(f'import triadb: {result["import"]} sec (budget {args.import_budget} sec)')
+    print(f'MIS():         {result["mis"]} sec (budget {args.mis_budget} sec)')
+    print(f'Lazy modules loaded: {", ".join(result["loaded"]) or "none"}')
+    print('PASSED' if result['passed'] else 'FAILED')
+    return 0 if result['passed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,21 +14,47 @@ If not, see <https://www.gnu.org/licenses/>.
 """
 
 
+import math
 import time
+import asyncio
+import threading
+from uuid import uuid4
+from functools import partial
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from orator import DatabaseManager
 from clickhouse_driver import Client
 from .utils import ETL, sql_construct
 from .exceptions import (InvalidCmdOperation, InvalidEngine, InvalidSourceType, PandasError)
-from .exceptions import DBConnectionFailed
+from .exceptions import DBConnectionFailed, QueryTimeout, PoolTimeout
 
 cmd_types = ['parts', 'mutations', 'optimize', 'query_log', 'tables', 'columns', 'create',
              'insert', 'select']
 
 engine_types = ['MergeTree', 'ReplacingMergeTree']
 
+# ClickHouse server error codes of queries that exceeded max_execution_time or were killed
+timeout_error_codes = [159, 394]
+
 source_types = ['file', 'TabSeparatedWithNames', 'CSVWithNames', 'MySQL',
                 'ImportedDataResource', 'ImportedDataResourceWithRightJoin',
-                'DataTypeDictionary', 'TableEngine']
+                'DataTypeDictionary', 'TableEngine', 'DataFrame', 'PETL', 'NumPy']
+
+# sources of python data that are inserted with native protocol blocks
+data_source_types = ['DataFrame', 'PETL', 'NumPy']
+
+# Default named profiles of ClickHouse query settings, they are passed with each query to clickhouse-driver
+# `load`        : heavy inserts and merges when dictionary, hypergraph and import engines are loaded
+# `interactive` : latency sensitive queries of the dashboards, e.g. get_items(), get_tuples(), counts
+# `filter`      : statements of the associative filtering that update the states engine
+# Only the relative priority is set here, limits that depend on the server, e.g. max_threads, max_memory_usage,
+# are passed with the `settings` and `profiles` connection parameters
+settings_profiles = {
+    'load': {'priority': 10},
+    'interactive': {'priority': 1},
+    'filter': {'priority': 2}
+}
 
 # **********************************************************************
 #   ******************** Classes Specifications *********************
@@ -48,6 +74,8 @@ class MariaDB(object):
         self._database = database
         self._api = None
         self._last_query = None
+        # per connection query statistics, i.e. number of queries, failed queries and total elapsed time
+        self._stats = {'queries': 0, 'errors': 0, 'elapsed': 0}
 
         # Debug messages
         self._trace = trace
@@ -81,12 +109,40 @@ class MariaDB(object):
     def last_query_stats(self):
         return None
 
-    def sql(self, q):
-        return self._api.select(q)
+    @property
+    def stats(self):
+        return self._stats
+
+    def sql(self, q, bindings=None):
+        """
+        :param q: SQL query, it may have %s placeholders
+        :param bindings: list of values that are bound to the placeholders of the query
+        :return: list of rows
+        """
+        self._last_query = q
+        t_start = time.perf_counter()
+        try:
+            return self._api.select(q, bindings or [])
+        except Exception:
+            self._stats['errors'] += 1
+            raise
+        finally:
+            self._stats['queries'] += 1
+            self._stats['elapsed'] += time.perf_counter() - t_start
 
     def cmd(self):
         pass
 
+    def ping(self):
+        try:
+            self._api.select('SELECT 1')
+        except Exception:
+            return False
+        return True
+
+    def disconnect(self):
+        self._api.disconnect()
+
 # ***************************************************************************************
 # ************************** End of MariaDB Class **************************************
 # ***************************************************************************************
@@ -98,7 +154,8 @@ class ClickHouse(object):
     It defines at a higher-level useful commands and adds to this API tracing/debug functionality and
     improved output format with Pandas dataframes.
     """
-    def __init__(self, host, port, user, password, database, trace=0):
+    def __init__(self, host, port, user, password, database, trace=0, compression=False, profiles=None,
+                 settings=None):
         self._client = 'ClickHouse'
         self._host = host
         self._port = port
@@ -108,6 +165,17 @@ class ClickHouse(object):
         self._api = None
         self._trace = trace
         self._last_query = None
+        # per connection query statistics, i.e. number of queries, failed queries and total elapsed time
+        self._stats = {'queries': 0, 'errors': 0, 'elapsed': 0}
+        # registry of query metrics by query id, it is shared by the connections of a pool
+        self._metrics = None
+        # named profiles of query settings
+        self._profiles = dict(settings_profiles, **(profiles or {}))
+        # query settings of the connection, the settings of a profile are applied on top of them
+        self._settings = dict(settings or {})
+        # control connection that is used to kill queries on expiry of their deadline
+        self._control = None
+        self._control_lock = threading.Lock()
         # clickhouser-driver last query execution statistics variables
         (self._lastquery_id, self._resultset_rows, self._elapsed, self._processed_rows,
          self._processed_bytes, self._total_rows) = [None, None, None, None, None, None]
@@ -116,7 +184,8 @@ class ClickHouse(object):
             self._host = '127.0.0.1'
         # Create connection with clickhouse driver API
         try:
-            self._api = Client(host=host, database=database, port=port, user=user, password=password)
+            self._api = Client(host=host, database=database, port=port, user=user, password=password,
+                               compression=compression)
             self._api.execute('SHOW TABLES')
         except Exception:
             raise DBConnectionFailed(f'Connection to ClickHouse failed. Check connection parameters')
@@ -130,8 +199,77 @@ class ClickHouse(object):
         return [self._lastquery_id, self._resultset_rows, self._elapsed,
                 self._processed_rows, self._processed_bytes, self._total_rows]
 
-    def sql(self, sql='', cols=None, index=None, split=True, auto=False,
-            params=None, columnar=False, qid=None, execute=True):
+    @property
+    def stats(self):
+        return self._stats
+
+    def ping(self):
+        try:
+            self._api.execute('SELECT 1')
+        except Exception:
+            return False
+        return True
+
+    def get_settings(self, profile=None, settings=None):
+        """
+        :param profile: name of a settings profile, e.g. `load`, `interactive`, `filter`
+        :param settings: query settings that override those of the profile
+        :return: dictionary of query settings or None
+        """
+        if profile is None and not settings and not self._settings:
+            return None
+        if profile is not None and profile not in self._profiles:
+            raise InvalidCmdOperation(f'Invalid settings profile <{profile}>, '
+                                      f'available profiles are {list(self._profiles)}')
+        result = dict(self._settings)
+        result.update(self._profiles.get(profile, {}))
+        result.update(settings or {})
+        return result
+
+    def _start_deadline(self, timeout, query_id):
+        """
+        Start a timer that kills the query in ClickHouse server when the deadline expires.
+        The query is killed from a separate control connection because this connection is busy
+        """
+        def kill():
+            timer.expired = True
+            try:
+                self.kill_query(query_id)
+            except Exception:
+                pass
+        timer = threading.Timer(timeout, kill)
+        timer.expired = False
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def kill_query(self, query_id):
+        """
+        Send KILL QUERY for a running query with a control connection
+        :param query_id: the unique query id that was sent to ClickHouse server
+        """
+        with self._control_lock:
+            if self._control is None:
+                self._control = Client(host=self._host, database=self._database, port=self._port,
+                                       user=self._user, password=self._password)
+            return self._control.execute(f"KILL QUERY WHERE query_id = '{query_id}' ASYNC")
+
+    @staticmethod
+    def _parse_columns(sql, cols, index, split, auto):
+        if auto:
+            pos1 = sql.find('SELECT') + 7
+            pos2 = sql.find('FROM', pos1)
+            cols = sql[pos1:pos2 - 1]
+
+        if cols and split:
+            cols = cols.split(', ')
+        if index and split:
+            index = index.split(', ')
+        return cols, index
+
+    def sql(self, sql='', cols=None, index=None, split=True, auto=False, params=None, columnar=False,
+            categorical=False, qid=None, execute=True, stream=False, chunk_rows=65536, out='dataframe',
+            profile=None, settings=None, timeout=None):
         """
         This method is calling clickhouse-driver execute() method to execute sql query
         Connection has already been established.
@@ -141,14 +279,34 @@ class ClickHouse(object):
         :param split: either split the columns string argument or leave it
         :param auto: if True, it will try to extract the columns from SQL SELECT , , , FROM and pass them to `cols`
         :param params: clickhouse-client executeparameters
-        :param columnar: if specified the result will be returned in column-oriented form. Defaults row-like form.
-        :param qid: query identifier. If no query id specified ClickHouse server will generate it
+        :param columnar: if specified the result is fetched in column-oriented form and the pandas dataframe
+                         is constructed directly from the column arrays. Defaults row-like form.
+        :param categorical: in columnar form, convert String columns to pandas categorical dtype,
+                            either True for all String columns or a list of column names
+        :param qid: query identifier. A unique suffix is appended to it before it is sent to ClickHouse server,
+                    so that the same statement can run concurrently on pooled connections.
+                    If no query id specified ClickHouse server will generate it
         :param execute: execute SQL commands only if execute=True
-
-        :return: pandas dataframe
+        :param stream: if True, stream the result set with clickhouse-driver execute_iter() in chunks of rows
+        :param chunk_rows: number of rows in each chunk of the streamed result set
+        :param out: format of the streamed chunks, either `dataframe` (pandas) or `numpy` (record array)
+        :param profile: name of the settings profile for the query, see `settings_profiles`
+        :param settings: clickhouse query settings, they override those of the profile
+        :param timeout: deadline of the query in seconds, on expiry the query is killed in ClickHouse server
+                        and QueryTimeout is raised
+
+        :return: pandas dataframe, or a generator of chunks when stream=True
         """
+        settings = self.get_settings(profile, settings)
+        if timeout:
+            settings = dict(settings or {}, max_execution_time=math.ceil(timeout), timeout_overflow_mode='throw')
+        if stream and execute:
+            cols, index = self._parse_columns(sql, cols, index, split, auto)
+            return self._stream(sql, cols, index, params, qid, chunk_rows, out, settings)
+
         # Initialization stage
         tuples = ()
+        types = []
         self._last_query = sql
         self._lastquery_id = qid
         (self._elapsed, self._resultset_rows, self._processed_rows,
@@ -156,12 +314,33 @@ class ClickHouse(object):
 
         # clickhouse-driver execution of sql statement
         # ToDO: 1. choose the ouput format, i.e. display tuples, pandas dataframe, dictionary, etc...
-        #
-        # ToDO: 2. paging with a generator e.g. gen = (row for row in cql.execute('SELECT * from FloatOnSSD_SRC')
-        # ToDo: 2. and clickhouse-driver streaming results, i.e. execute_iter command
         if execute:
-            tuples = self._api.execute(query=sql, params=params, columnar=columnar, query_id=qid)
+            query_id = f'{qid}-{uuid4().hex}' if qid else None
+            if timeout and not query_id:
+                query_id = uuid4().hex
+            timer = self._start_deadline(timeout, query_id) if timeout else None
+            t_query = time.perf_counter()
+            try:
+                if columnar:
+                    tuples, types = self._api.execute(query=sql, params=params, columnar=True, with_column_types=True,
+                                                      query_id=query_id, settings=settings)
+                else:
+                    tuples = self._api.execute(query=sql, params=params, query_id=query_id, settings=settings)
+            except Exception as e:
+                self._stats['errors'] += 1
+                if self._metrics is not None:
+                    self._metrics.record(qid, elapsed=time.perf_counter() - t_query, error=True)
+                if timer and (timer.expired or getattr(e, 'code', None) in timeout_error_codes):
+                    # reset the connection, clickhouse-driver will reconnect on the next query
+                    self._api.disconnect()
+                    raise QueryTimeout(f'Query {query_id} exceeded the deadline of {timeout} sec') from None
+                raise
+            finally:
+                self._stats['queries'] += 1
+                if timer:
+                    timer.cancel()
             self._elapsed = self._api.last_query.elapsed
+            self._stats['elapsed'] += self._elapsed
             # Avoid AttributeError: 'NoneType' object has no attribute 'rows' in clickhouse-driver
             try:
                 self._resultset_rows = self._api.last_query.profile_info.rows
@@ -174,22 +353,23 @@ class ClickHouse(object):
         # Transform tuples to pandas dataframe
         # Start measuring elapsed time for transforming python tuples to pandas dataframe
         t_start = time.perf_counter()
-        if auto:
-            pos1 = sql.find('SELECT') + 7
-            pos2 = sql.find('FROM', pos1)
-            cols = sql[pos1:pos2 - 1]
-
-        if cols and split:
-            cols = cols.split(', ')
-        if index and split:
-            index = index.split(', ')
+        cols, index = self._parse_columns(sql, cols, index, split, auto)
         try:
-            result = ETL.get_dataframe(tuples, cols, index)
+            if columnar:
+                cols = cols or [name for name, _ in types]
+                if categorical is True:
+                    categorical = [col for col, (_, ctype) in zip(cols, types) if ctype.endswith('String')]
+                result = ETL.get_columnar_dataframe(tuples, cols, index, categorical)
+            else:
+                result = ETL.get_dataframe(tuples, cols, index)
         except Exception:
             print(sql)
             raise PandasError(f'Failed to construct Pandas dataframe, check query and parameters')
         # End measuring elapsed time for pandas dataframe transformation
         t_end = time.perf_counter()
+        if execute and self._metrics is not None:
+            self._metrics.record(qid, elapsed=self._elapsed, rows=self._processed_rows, nbytes=self._processed_bytes,
+                                 result_rows=len(result), conversion=t_end - t_start)
 
         # Debug info
         if self._trace > 2:
@@ -209,10 +389,74 @@ class ClickHouse(object):
         else:
             return result
 
+    def _stream(self, sql, cols, index, params, qid, chunk_rows, out, settings=None):
+        """
+        Generator of the `sql` method in streaming mode. The result set is fetched with execute_iter()
+        block by block and it is yielded in chunks of `chunk_rows` rows, so that the whole result set
+        is never held in memory.
+        """
+        self._last_query = sql
+        self._lastquery_id = qid
+        (self._elapsed, self._resultset_rows, self._processed_rows,
+         self._processed_bytes, self._total_rows) = [0, 0, 0, 0, 0]
+        query_id = f'{qid}-{uuid4().hex}' if qid else None
+
+        t_start = time.perf_counter()
+        rows = self._api.execute_iter(query=sql, params=params, query_id=query_id,
+                                      settings=dict(settings or {}, max_block_size=chunk_rows))
+        chunk = []
+        error = False
+        try:
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == chunk_rows:
+                    self._resultset_rows += len(chunk)
+                    yield self._chunk(chunk, cols, index, out)
+                    chunk = []
+            if chunk:
+                self._resultset_rows += len(chunk)
+                yield self._chunk(chunk, cols, index, out)
+        except GeneratorExit:
+            # The consumer stopped before the end of the result set, the rest of the packets are still pending
+            # on the socket, reset the connection, clickhouse-driver will reconnect on the next query
+            self._api.disconnect()
+            raise
+        except Exception as e:
+            error = True
+            self._stats['errors'] += 1
+            if getattr(e, 'code', None) in timeout_error_codes:
+                self._api.disconnect()
+                raise QueryTimeout(f'Query {query_id} exceeded the deadline of its max_execution_time') from None
+            raise
+        finally:
+            self._stats['queries'] += 1
+            self._elapsed = time.perf_counter() - t_start
+            self._stats['elapsed'] += self._elapsed
+            # the rows streamed so far are recorded also when the generator is closed before the end
+            if self._metrics is not None:
+                self._metrics.record(qid, elapsed=self._elapsed, result_rows=self._resultset_rows, error=error)
+
+        if self._trace > 0:
+            lqs = self.last_query_stats
+            print(f'QueryID:{lqs[0]}\nElapsed: {round(lqs[2], 3)} sec',
+                  f'{lqs[1]} rows streamed in chunks of {chunk_rows} rows',
+                  '\n___________________________________________________________________________')
+
+    @staticmethod
+    def _chunk(rows, cols, index, out):
+        try:
+            result = ETL.get_dataframe(rows, cols, index)
+        except Exception:
+            raise PandasError(f'Failed to construct Pandas dataframe, check query and parameters')
+        if out == 'numpy':
+            result = result.to_records(index=bool(index))
+        return result
+
     def cmd(self, cmd, dbhost=None, dbport=None, dbuser=None, dbpassword=None,
             db=None, table=None, engine=None, partkey=None, skey=None, settings=None,
             aggr=False, group_by=None, heading=None, fields=None, projection='*', where=None, hb2=None,
-            source=None, ha2=None, fullpath=None, sql=None, active=True, limit=None, execute=True):
+            source=None, ha2=None, fullpath=None, sql=None, active=True, limit=None, execute=True,
+            data=None, block_size=65536, profile=None):
         """
         Basically this is a wrapper method that constructs sql statements,
         `sql` method executes these statements
@@ -243,6 +487,9 @@ class ClickHouse(object):
         :param ha2: attribute dimension that is used in insert command (ImportedDataResourceWithRightJoin)
         :param limit: SQL limit
         :param execute: Execute the command only if execute=True
+        :param data: python data to insert, pandas dataframe, petl table or numpy array (DataFrame, PETL, NumPy source)
+        :param block_size: number of rows in each block of data that is sent to ClickHouse
+        :param profile: name of the settings profile for the queries of the command, see `settings_profiles`
 
         Each one of the following commands takes specific paramaters, `execute` is common for all of them:
         `tables`    : db, engine, table, group_by
@@ -261,8 +508,9 @@ class ClickHouse(object):
 
         `select`    : dbhost, dbport, dbuser, dbpassword, db, table,
                       source, fullpath, heading, fields, where, projection, limit
+                      (ImportedDataResource: table, heading, fields, where)
 
-        `insert`    : table, fields, source, ha2
+        `insert`    : table, fields, source, ha2, data, block_size
 
         :return: query result set in a pandas dataframe
         """
@@ -302,7 +550,7 @@ class ClickHouse(object):
             query = sql_construct(select=sel, frm=frm, where=wh, order=ordname)
             # execute SQL query
             cols = 'table, db, PID, name, active, marks, rows, min_blk, max_blk, level, pk_mem (KB)'
-            return self.sql(query, cols, index='PID', qid='Parts Command', execute=execute)
+            return self.sql(query, cols, index='PID', qid='Parts Command', execute=execute, profile=profile)
         elif cmd == 'mutations' and table is not None:
             # mutations allows changing or deleting lots of rows in a table
             # return information about mutations of MergeTree tables and their progress
@@ -323,13 +571,13 @@ class ClickHouse(object):
             query = sql_construct(select=sel, frm=frm, where=wh, group_by=grp, order=ordtime, limit=lim)
             # execute SQL query
             cols = 'table, command, created_at, blk, parts, is_done, failed_at, failed_time'
-            self.sql('system flush logs', qid='flush logs', execute=execute)
-            return self.sql(query, cols, qid='Mutation Information Command', execute=execute)
+            self.sql('system flush logs', qid='flush logs', execute=execute, profile=profile)
+            return self.sql(query, cols, qid='Mutation Information Command', execute=execute, profile=profile)
         elif cmd == 'optimize' and table is not None:
             # construct query
             query = f'OPTIMIZE TABLE {table} FINAL'
             # execute SQL query
-            return self.sql(query, qid='Optimize Engine Command', execute=execute)
+            return self.sql(query, qid='Optimize Engine Command', execute=execute, profile=profile)
         elif cmd == 'query_log':
             # metadata for queries logged in the ClickHouse table with log_queries=1 setting
             sel = f'SELECT query_id AS id, user, client_hostname as host, client_name as client,'
@@ -344,8 +592,8 @@ class ClickHouse(object):
             query = sql_construct(select=sel, frm=frm, where=wh, order=ordtime)
             # execute SQL query
             cols = 'id, user, host, client, in_set, sec, MEM_MB, R_Rows, R_MB, W_Rows, W_MB, query'
-            self.sql('system flush logs', qid='flush logs command', execute=execute)
-            return self.sql(query, cols, qid='Query Log Command', index='id', execute=execute)
+            self.sql('system flush logs', qid='flush logs command', execute=execute, profile=profile)
+            return self.sql(query, cols, qid='Query Log Command', index='id', execute=execute, profile=profile)
         elif cmd == 'tables':
             # Contains metadata of each table that the server knows about. Detached tables are not shown
             sel = f'SELECT database as db, engine, name as table, '
@@ -368,7 +616,7 @@ class ClickHouse(object):
             else:
                 cols = 'db, engine, table, partkey, skey, pkey'
             # execute SQL query
-            return self.sql(query, cols, qid='Table Engines Metadata Command', execute=execute)
+            return self.sql(query, cols, qid='Table Engines Metadata Command', execute=execute, profile=profile)
         elif cmd == 'columns':
             # information about the columns in a table.
             sel = f'SELECT name, comment, type,'
@@ -394,7 +642,7 @@ class ClickHouse(object):
             else:
                 cols = 'name, comment, type, Compressed_MB, Uncomressed_MB, marks_KB'
             # execute SQL query
-            return self.sql(query, cols, qid='Table Columns Metadata Command', execute=execute)
+            return self.sql(query, cols, qid='Table Columns Metadata Command', execute=execute, profile=profile)
         elif cmd == 'create':
             # Check engine passed
             if engine not in engine_types:
@@ -409,8 +657,8 @@ class ClickHouse(object):
             query += f'\nSETTINGS {settings}'
 
             # execute SQL query
-            self.sql(f'DROP TABLE IF EXISTS {table}', qid=f'Drop Table {table}', execute=execute)
-            return self.sql(query, qid=f'Create Engine {engine} Command', execute=execute)
+            self.sql(f'DROP TABLE IF EXISTS {table}', qid=f'Drop Table {table}', execute=execute, profile=profile)
+            return self.sql(query, qid=f'Create Engine {engine} Command', execute=execute, profile=profile)
         elif cmd == 'select':
             if source not in source_types:
                 raise InvalidSourceType(f'Invalid TRIADB source type: failed with parameter source={source}')
@@ -444,7 +692,7 @@ class ClickHouse(object):
                 query = sql_construct(select=sel, frm=frm, where=wh, limit=lim)
                 # execute SQL query
                 result = self.sql(query, qid='Select rows from flat file Command',
-                                  cols=fields, split=False, execute=execute)
+                                  cols=fields, split=False, execute=execute, profile=profile)
             elif source == 'ImportedDataResource':
                 structure = ', '.join(heading)
                 sel = f'SELECT {structure}'
@@ -452,11 +700,12 @@ class ClickHouse(object):
                 grp = 'GROUP BY val'
                 hav = 'HAVING isNotNull(val)'
                 ordval = 'ORDER BY val'
+                wh = f'WHERE {where}' if where else None
                 # construct query
-                query = sql_construct(select=sel, frm=frm, group_by=grp, having=hav, order=ordval)
+                query = sql_construct(select=sel, frm=frm, where=wh, group_by=grp, having=hav, order=ordval)
                 # execute SQL query
                 result = self.sql(query, qid='Select HyperAtom AdjacencyLists Command',
-                                  cols=fields, split=False, execute=execute)
+                                  cols=fields, split=False, execute=execute, profile=profile)
             # if query is used in other commands use execute=false to return it
             if execute:
                 return result
@@ -467,6 +716,17 @@ class ClickHouse(object):
                 raise InvalidSourceType(f'Invalid TRIADB source type: failed with parameter source={source}')
             sqlid = None
             frm = None
+            # Inserting python data with native protocol blocks
+            if source in data_source_types:
+                query = f'INSERT INTO {table}'
+                if fields:
+                    query += ' (' + ', '.join(fields) + ')'
+                query += ' VALUES'
+                if not execute:
+                    return query
+                rows = ETL.get_rows(data, fields, types=self._column_types(table), block_size=block_size)
+                return self._insert_rows(query, rows, qid=f'InsertFrom{source}', block_size=block_size,
+                                         settings=self.get_settings(profile))
             # Inserting the results of SELECT
             ins = f'INSERT INTO {table}'
             sel = f'SELECT ' + ', '.join(fields)
@@ -499,41 +759,355 @@ class ClickHouse(object):
                 sqlid = 'InsertFromDataTypeDictionary'
             # construct query
             query = ins + f'\n{sel}\n{frm}'
-            return self.sql(query, qid=f'{sqlid} Command', execute=execute)
+            return self.sql(query, qid=f'{sqlid} Command', execute=execute, profile=profile)
         else:
             raise InvalidCmdOperation(f'Invalid command operation')
 
+    def _column_types(self, table):
+        """
+        :param table: name of the table
+        :return: dictionary of ClickHouse column types by column name
+        """
+        return {name: ctype for name, ctype, *_ in self._api.execute(f'DESCRIBE TABLE {table}')}
+
+    def _insert_rows(self, query, rows, qid=None, block_size=65536, settings=None):
+        """
+        Send rows to ClickHouse in a single INSERT query, the driver splits them into native protocol blocks
+        :param query: INSERT INTO table (columns) VALUES
+        :param rows: iterable of row tuples, e.g. a generator
+        :param qid: query identifier
+        :param block_size: number of rows in each block of data that is sent to ClickHouse
+        :param settings: clickhouse query settings
+        :return: number of rows inserted
+        """
+        self._last_query = query
+        self._lastquery_id = qid
+        (self._elapsed, self._resultset_rows, self._processed_rows,
+         self._processed_bytes, self._total_rows) = [0, 0, 0, 0, 0]
+        settings = dict(settings or {}, insert_block_size=block_size)
+        query_id = f'{qid}-{uuid4().hex}' if qid else None
+
+        def counted(iterable):
+            for row in iterable:
+                self._processed_rows += 1
+                yield row
+
+        t_start = time.perf_counter()
+        try:
+            self._api.execute(query, counted(rows), query_id=query_id, settings=settings)
+        except Exception:
+            self._stats['errors'] += 1
+            if self._metrics is not None:
+                self._metrics.record(qid, elapsed=time.perf_counter() - t_start, error=True)
+            raise
+        finally:
+            self._stats['queries'] += 1
+        self._total_rows = self._processed_rows
+        self._elapsed = time.perf_counter() - t_start
+        self._stats['elapsed'] += self._elapsed
+        if self._metrics is not None:
+            self._metrics.record(qid, elapsed=self._elapsed, rows=self._processed_rows)
+
+        if self._trace > 1:
+            print(f'{self._last_query}\n╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌╌')
+        if self._trace > 0:
+            print(f'QueryID:{qid}\nElapsed: {round(self._elapsed, 3)} sec',
+                  f'{self._processed_rows} rows inserted.',
+                  '\n___________________________________________________________________________')
+        return self._processed_rows
+
     def disconnect(self):
         self._api.disconnect()
+        if self._control is not None:
+            self._control.disconnect()
 
 
 # ***************************************************************************************
 # ************************** End of ClickHouse Class ************************************
 # ***************************************************************************************
+class QueryMetrics(object):
+    """
+    QueryMetrics is a thread-safe registry of query metrics keyed by query id (qid), e.g. 'Projection',
+    'Filtering', 'Insert VW_pos into HAtom_States'.
+
+    For each qid it keeps the number of executions and errors, the latencies of the last `reservoir`
+    executions to estimate percentiles, the rows and bytes processed by ClickHouse, the rows in the
+    result set and the time spent to transform the result set to pandas dataframe.
+    """
+    def __init__(self, reservoir=1000):
+        """
+        :param reservoir: number of latest latencies kept for each qid
+        """
+        self._reservoir = reservoir
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def record(self, qid, elapsed=0, rows=0, nbytes=0, result_rows=0, conversion=0, error=False):
+        """
+        :param qid: query identifier
+        :param elapsed: query latency in seconds
+        :param rows: rows processed by ClickHouse
+        :param nbytes: bytes processed by ClickHouse
+        :param result_rows: rows in the result set
+        :param conversion: seconds spent to construct the pandas dataframe
+        :param error: query failed
+        """
+        qid = qid or 'Unnamed'
+        with self._lock:
+            m = self._metrics.get(qid)
+            if m is None:
+                m = self._metrics[qid] = {'count': 0, 'errors': 0, 'latency': deque(maxlen=self._reservoir),
+                                          'elapsed': 0, 'rows': 0, 'bytes': 0, 'result_rows': 0, 'conversion': 0}
+            m['count'] += 1
+            m['latency'].append(elapsed)
+            m['elapsed'] += elapsed
+            if error:
+                m['errors'] += 1
+            m['rows'] += rows or 0
+            m['bytes'] += nbytes or 0
+            m['result_rows'] += result_rows or 0
+            m['conversion'] += conversion
+
+    @staticmethod
+    def _percentile(values, p):
+        # nearest-rank percentile of sorted values
+        return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+    def to_dict(self):
+        """
+        :return: dictionary of metrics for each qid, latencies in seconds
+        """
+        with self._lock:
+            snapshot = {qid: dict(m, latency=sorted(m['latency'])) for qid, m in self._metrics.items()}
+        result = {}
+        for qid, m in snapshot.items():
+            latency = m['latency'] or [0]
+            result[qid] = {'count': m['count'], 'errors': m['errors'],
+                           'p50': round(self._percentile(latency, 50), 6),
+                           'p95': round(self._percentile(latency, 95), 6),
+                           'p99': round(self._percentile(latency, 99), 6),
+                           'max': round(latency[-1], 6), 'total_sec': round(m['elapsed'], 6),
+                           'rows': m['rows'], 'bytes': m['bytes'], 'result_rows': m['result_rows'],
+                           'conversion_sec': round(m['conversion'], 6)}
+        return result
+
+    def summary(self, order_by='total_sec'):
+        """
+        :param order_by: column to sort the metrics in descending order
+        :return: pandas dataframe with the metrics of each qid
+        """
+        d = self.to_dict()
+        columns = ['count', 'errors', 'p50', 'p95', 'p99', 'max', 'total_sec',
+                   'rows', 'bytes', 'result_rows', 'conversion_sec']
+        df = ETL.get_dataframe([[qid] + [m[col] for col in columns] for qid, m in d.items()],
+                               columns=['qid'] + columns, ndx='qid')
+        return df.sort_values(by=order_by, ascending=False)
+
+    def dump_json(self, fname):
+        """
+        :param fname: path of the JSON file
+        """
+        return ETL.write_json(self.to_dict(), fname)
+
+    def reset(self):
+        with self._lock:
+            self._metrics = {}
+
+# ***************************************************************************************
+# ************************** End of QueryMetrics Class ***********************
+# ***************************************************************************************
+
+
+class QueryCache(object):
+    """
+    QueryCache is a thread-safe LRU cache of query results with a memory budget in bytes.
+
+    Results are keyed by the normalized SQL statement, the parameters of the result dataframe and the
+    state epoch. The epoch is bumped whenever the associative state or the data may have changed,
+    e.g. after filtering or restart, and the cached results of the previous state are dropped.
+    """
+    def __init__(self, max_bytes):
+        """
+        :param max_bytes: memory budget of the cached results in bytes
+        """
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (result, size in bytes)
+        self._bytes = 0
+        self._epoch = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def is_cacheable(sql):
+        """
+        :param sql: SQL statement
+        :return: True for SELECT queries that do not read ClickHouse system tables
+        """
+        return sql.lstrip().upper().startswith('SELECT') and 'system.' not in sql
+
+    @staticmethod
+    def is_read_only(sql):
+        """
+        :param sql: SQL statement
+        :return: True for statements that do not modify data or engines, e.g. SELECT, EXISTS, SHOW, DESCRIBE
+        """
+        words = sql.split(None, 1)
+        return bool(words) and words[0].upper() in ['SELECT', 'WITH', 'EXISTS', 'SHOW', 'DESCRIBE', 'DESC']
+
+    @staticmethod
+    def _sizeof(result):
+        if result is None:
+            return 0
+        return int(result.memory_usage(index=True, deep=True).sum())
+
+    def key(self, sql, *args):
+        """
+        :param sql: SQL statement, white space is normalized
+        :param args: other parameters that affect the result, e.g. dataframe columns and index
+        :return: cache key in the current epoch
+        """
+        return (' '.join(sql.split()), repr(args), self._epoch)
+
+    def get(self, key):
+        """
+        :return: (True, deep copy of the cached result) on a hit, (False, None) on a miss
+        """
+        with self._lock:
+            if key not in self._entries:
+                self._misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            result = self._entries[key][0]
+        return True, None if result is None else result.copy(deep=True)
+
+    def put(self, key, result):
+        size = self._sizeof(result)
+        if size > self._max_bytes:
+            return
+        with self._lock:
+            if key[2] != self._epoch:
+                # the state has changed while the query was running
+                return
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (result, size)
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def bump_epoch(self):
+        """
+        Invalidate all the cached results
+        """
+        with self._lock:
+            self._epoch += 1
+            self._bytes = 0
+            self._entries.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    @property
+    def epoch(self):
+        return self._epoch
+
+    @property
+    def stats(self):
+        """
+        :return: dictionary with hits, misses, evictions, entries, bytes and epoch of the cache
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {'hits': self._hits, 'misses': self._misses,
+                    'hit_ratio': round(self._hits / lookups, 3) if lookups else 0,
+                    'evictions': self._evictions, 'entries': len(self._entries),
+                    'bytes': self._bytes, 'max_bytes': self._max_bytes, 'epoch': self._epoch}
+
+# ***************************************************************************************
+# ************************** End of QueryCache Class ***********************
+# ***************************************************************************************
+
+
 class ConnectionPool(object):
     """
-    ConnectionPool manages connections to DBMS and provides common functionality
+    ConnectionPool manages a thread-safe pool of connections to DBMS and provides common functionality
     e.g. `sql`, `cmd`, `qstats`.....
+
+    Each `sql`, `cmd` call checks out a connection from the pool and checks it back in when it is done,
+    so that concurrent callers, e.g. Dash workers, run their queries in parallel on separate connections.
+    The first connection is created eagerly to validate connection parameters, the rest are created on demand
+    up to `pool_size` connections. Idle connections are health checked before they are reused and
+    they are closed when they stay idle longer than `max_idle` seconds. A caller that waits longer than
+    `checkout_timeout` seconds for a connection gets a PoolTimeout error.
     """
     mysql_connections = 0
     clickhouse_connections = 0
 
-    def __init__(self, dbms, host, port, user, password, database, trace=0):
+    # seconds a connection may stay idle before it is health checked on checkout
+    ping_interval = 60
+
+    def __init__(self, dbms, host, port, user, password, database, trace=0, pool_size=4, max_idle=300,
+                 cache_size=0, compression=False, profiles=None, settings=None, checkout_timeout=30,
+                 reserve_api=False):
+        """
+        :param dbms: either `clickhouse` or `mariadb`
+        :param host: host connection parameter, name or IP address
+        :param port: the port number used by the database server
+        :param user: database user
+        :param password: database user password
+        :param database: database name
+        :param trace: flag to display more information during execution of query
+        :param pool_size: maximum number of connections in the pool
+        :param max_idle: seconds after which an idle connection is closed, the first connection is never closed
+        :param cache_size: memory budget in bytes of the ClickHouse query result cache, 0 disables caching
+        :param compression: ClickHouse wire compression of data blocks, e.g. True (lz4), 'lz4', 'lz4hc' or 'zstd'
+        :param profiles: ClickHouse settings profiles that are added to or replace `settings_profiles`
+        :param settings: ClickHouse query settings of every query, e.g. {'max_memory_usage': 8000000000}
+        :param checkout_timeout: maximum seconds to wait for a connection of the pool, None waits forever
+        :param reserve_api: keep the first connection out of the pool, it is used only by the API client,
+                            e.g. Orator models, and the pooled queries run on their own connections
+        """
         # Get connector, either ClickHouse or MariaDB
         self._connector = self._get_connector(dbms)
-        # Create a new connection
-        self._connection = self._connector(host, port, user, password, database, trace)
 
         self._host = host       # host connection parameter, name or IP address
         self._port = port       # the port number used by the database server
         self._user = user
         self._password = password
-        self._client = self._connection._client   # the name of the DBMS, i.e. ClickHouse or MariaDB
+        self._db = database
         self._trace = trace                       # flag to display more information during execution of query
-
-        # Methods composition
-        self.sql = self._connection.sql
-        self.cmd = self._connection.cmd
+        self._compression = compression           # ClickHouse wire compression
+        self._profiles = profiles                 # ClickHouse settings profiles
+        self._settings = settings                 # ClickHouse query settings of the connections
+
+        self._pool_size = max(1, pool_size)       # maximum number of connections
+        self._max_idle = max_idle                 # maximum idle time of a connection in seconds
+        self._checkout_timeout = checkout_timeout # maximum seconds to wait for a connection
+        self._reserve_api = reserve_api           # the API connection is not shared with the pool
+        self._lock = threading.Condition()        # guards the pool state below
+        self._connections = []                    # all the connections that are open
+        self._idle = []                           # (connection, checkin time) pairs ready to be checked out
+        self._pending = 0                         # number of connections that are being created
+        self._local = threading.local()           # connection used last by the current thread
+        self._cache = None                        # cache of SELECT query results
+        self._metrics = QueryMetrics()            # query metrics of all the connections by qid
+
+        # Create the first connection, it is used for the API client and it is never evicted
+        self._connection = self._open()
+        if self._reserve_api:
+            self._connections.remove(self._connection)
+        else:
+            self._idle.append((self._connection, time.monotonic()))
+        self._client = self._connection._client   # the name of the DBMS, i.e. ClickHouse or MariaDB
+        if cache_size and self._client == 'ClickHouse':
+            self._cache = QueryCache(cache_size)
 
         if self._trace > 3:
             print(f'\nConnected to {self.__repr__()}')
@@ -541,14 +1115,261 @@ class ConnectionPool(object):
     @staticmethod
     def _get_connector(dbms):
         if dbms == 'clickhouse':
-            ConnectionPool.clickhouse_connections += 1
             return ClickHouse
         elif dbms == 'mariadb':
-            ConnectionPool.mysql_connections += 1
             return MariaDB
         else:
             raise DBConnectionFailed(f'Connection to DBMS failed <{dbms} is not supported>')
 
+    def _open(self):
+        # Create a new connection
+        if self._connector is ClickHouse:
+            connection = self._connector(self._host, self._port, self._user, self._password, self._db,
+                                         self._trace, compression=self._compression, profiles=self._profiles,
+                                         settings=self._settings)
+            connection._metrics = self._metrics
+            ConnectionPool.clickhouse_connections += 1
+        else:
+            connection = self._connector(self._host, self._port, self._user, self._password, self._db, self._trace)
+            ConnectionPool.mysql_connections += 1
+        with self._lock:
+            self._connections.append(connection)
+        return connection
+
+    def _close(self, connection):
+        # Must be called with the lock acquired
+        self._connections.remove(connection)
+        try:
+            connection.disconnect()
+        except Exception:
+            pass
+
+    def _evict_idle(self):
+        # Must be called with the lock acquired
+        now = time.monotonic()
+        for connection, checkin_time in list(self._idle):
+            if connection is not self._connection and now - checkin_time > self._max_idle:
+                self._idle.remove((connection, checkin_time))
+                self._close(connection)
+                if self._trace > 3:
+                    print(f'Evicted idle connection {id(connection)} from {self.__repr__()}')
+
+    def checkout(self):
+        """
+        Wait until a connection is available and take it out of the pool
+        :return: a ClickHouse or MariaDB connection
+        """
+        connection, checkin_time = None, None
+        deadline = None if self._checkout_timeout is None else time.monotonic() + self._checkout_timeout
+        with self._lock:
+            while connection is None:
+                self._evict_idle()
+                if self._idle:
+                    connection, checkin_time = self._idle.pop()
+                elif len(self._connections) + self._pending < self._pool_size:
+                    self._pending += 1
+                    break
+                elif deadline is None:
+                    self._lock.wait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f'Checkout failed, all {self._pool_size} connections of '
+                                          f'{self.__repr__()} are busy after {self._checkout_timeout} sec')
+                    self._lock.wait(remaining)
+
+        if connection is None:
+            # Create a new connection outside the lock
+            try:
+                connection = self._open()
+            finally:
+                with self._lock:
+                    self._pending -= 1
+                    self._lock.notify()
+        elif time.monotonic() - checkin_time > self.ping_interval and not connection.ping():
+            # Health check failed, replace the connection, its slot is reserved until the replacement is open
+            with self._lock:
+                self._close(connection)
+                self._pending += 1
+            try:
+                connection = self._checkout_replacement(connection)
+            finally:
+                with self._lock:
+                    self._pending -= 1
+                    self._lock.notify()
+
+        self._local.connection = connection
+        return connection
+
+    def _checkout_replacement(self, connection):
+        replacement = self._open()
+        if connection is self._connection:
+            self._connection = replacement
+        return replacement
+
+    def checkin(self, connection):
+        """
+        Return a connection to the pool
+        :param connection: a connection that was taken with `checkout`
+        """
+        with self._lock:
+            if connection in self._connections:
+                self._idle.append((connection, time.monotonic()))
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager for a connection of the pool, e.g. `with pool.connection() as con: con.sql(...)`
+        """
+        connection = self.checkout()
+        try:
+            yield connection
+        finally:
+            self.checkin(connection)
+
+    def sql(self, *args, **kwargs):
+        """
+        Execute SQL query on a pooled connection, see ClickHouse.sql() and MariaDB.sql()
+        In streaming mode the connection is checked in when the generator of chunks is exhausted or closed
+        """
+        if kwargs.get('stream') and kwargs.get('execute', True):
+            return self._stream(*args, **kwargs)
+        if self._cache and kwargs.get('execute', True):
+            return self._cached_sql(*args, **kwargs)
+        with self.connection() as connection:
+            return connection.sql(*args, **kwargs)
+
+    def _cached_sql(self, sql='', *args, **kwargs):
+        if not QueryCache.is_cacheable(sql):
+            if QueryCache.is_read_only(sql):
+                with self.connection() as connection:
+                    return connection.sql(sql, *args, **kwargs)
+            # any other statement may modify data or engines, results that are cached while it is running
+            # belong to the old epoch and they are dropped when it is completed
+            self._cache.bump_epoch()
+            try:
+                with self.connection() as connection:
+                    return connection.sql(sql, *args, **kwargs)
+            finally:
+                self._cache.bump_epoch()
+        key = self._cache.key(sql, args, sorted((k, v) for k, v in kwargs.items() if k != 'qid'))
+        hit, result = self._cache.get(key)
+        if hit:
+            return result
+        with self.connection() as connection:
+            result = connection.sql(sql, *args, **kwargs)
+        self._cache.put(key, result)
+        return None if result is None else result.copy(deep=True)
+
+    def _stream(self, *args, **kwargs):
+        with self.connection() as connection:
+            yield from connection.sql(*args, **kwargs)
+
+    def cmd(self, *args, **kwargs):
+        """
+        Execute TRIADB command on a pooled connection, see ClickHouse.cmd()
+        """
+        command = args[0] if args else kwargs.get('cmd')
+        if not (self._cache and kwargs.get('execute', True) and command in ['create', 'insert', 'optimize']):
+            with self.connection() as connection:
+                return connection.cmd(*args, **kwargs)
+        self._cache.bump_epoch()
+        try:
+            with self.connection() as connection:
+                return connection.cmd(*args, **kwargs)
+        finally:
+            self._cache.bump_epoch()
+
+    def _timed_sql(self, sql, qid, profile=None):
+        t_start = time.perf_counter()
+        self.sql(sql, qid=qid, profile=profile)
+        return time.perf_counter() - t_start
+
+    def pipeline(self, statements, max_workers=None, execute=True, profile=None):
+        """
+        Execute a batch of SQL statements with explicit dependencies between them.
+        A statement is submitted as soon as all the statements it depends on are completed, so that independent
+        statements run concurrently on pooled connections. If a statement fails no other statement is submitted,
+        the statements that are running are completed and the exception is raised.
+
+        :param statements: list of (sql, qid, after) tuples, query ids must be unique in the batch and
+                           `after` is a sequence of the query ids that must complete before sql is executed
+        :param max_workers: maximum number of concurrent statements, defaults to the size of the pool
+        :param execute: execute the statements only if execute=True
+        :param profile: name of the settings profile for the statements
+        :return: dictionary of elapsed time in seconds for each query id in order of completion
+        """
+        pending = OrderedDict()
+        for sql, qid, after in statements:
+            if qid in pending:
+                raise InvalidCmdOperation(f'Invalid pipeline: duplicate query id <{qid}>')
+            pending[qid] = (sql, set(after))
+        for qid, (_, after) in pending.items():
+            if not after.issubset(pending):
+                raise InvalidCmdOperation(f'Invalid pipeline: <{qid}> depends on unknown query ids {after - set(pending)}')
+        timings = OrderedDict()
+        if not execute:
+            return timings
+
+        error = None
+        running = {}
+        with ThreadPoolExecutor(max_workers=max_workers or self._pool_size) as executor:
+            while pending or running:
+                if error is None:
+                    for qid in [qid for qid, (_, after) in pending.items() if after.issubset(timings)]:
+                        sql, _ = pending.pop(qid)
+                        running[executor.submit(self._timed_sql, sql, qid, profile)] = qid
+                if not running:
+                    if error is None:
+                        raise InvalidCmdOperation(f'Invalid pipeline: circular dependencies in {list(pending)}')
+                    break
+                completed, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    qid = running.pop(future)
+                    try:
+                        timings[qid] = future.result()
+                    except Exception as e:
+                        error = error or e
+        if error is not None:
+            raise error
+        return timings
+
+    def bump_epoch(self):
+        """
+        Invalidate the cached query results, it is called when the associative state changes
+        """
+        if self._cache:
+            self._cache.bump_epoch()
+
+    @property
+    def metrics(self):
+        """
+        :return: QueryMetrics registry of the pool
+        """
+        return self._metrics
+
+    @property
+    def cache_stats(self):
+        """
+        :return: hit/miss metrics of the query result cache or None if caching is disabled
+        """
+        return self._cache.stats if self._cache else None
+
+    def disconnect(self):
+        """
+        Close all the connections of the pool
+        """
+        with self._lock:
+            for connection in list(self._connections):
+                self._close(connection)
+            self._idle = []
+        if self._reserve_api:
+            try:
+                self._connection.disconnect()
+            except Exception:
+                pass
+
     @property
     def api(self):
         """
@@ -563,19 +1384,40 @@ class ConnectionPool(object):
         """
         return self._connection._database
 
+    @property
+    def pool_size(self):
+        """
+        :return: maximum number of connections in the pool
+        """
+        return self._pool_size
+
     @property
     def last_query(self):
         """
-        :return: last sql query executed
+        :return: last sql query executed from the current thread
         """
-        return self._connection.last_query
+        return getattr(self._local, 'connection', self._connection).last_query
 
     @property
     def qstats(self):
         """
-        :return: statistics for the execution of last sql query
+        :return: statistics for the execution of last sql query from the current thread
+        """
+        return getattr(self._local, 'connection', self._connection).last_query_stats
+
+    @property
+    def pool_stats(self):
+        """
+        :return: query statistics for each connection of the pool in a pandas dataframe
         """
-        return self._connection.last_query_stats
+        now = time.monotonic()
+        with self._lock:
+            idle = {id(connection): now - checkin_time for connection, checkin_time in self._idle}
+            rows = [[id(connection), 'idle' if id(connection) in idle else 'busy',
+                     connection.stats['queries'], connection.stats['errors'], round(connection.stats['elapsed'], 3),
+                     round(idle.get(id(connection), 0), 1)] for connection in self._connections]
+        return ETL.get_dataframe(rows, columns=['connection', 'state', 'queries', 'errors', 'elapsed', 'idle_sec'],
+                                 ndx='connection')
 
     def __repr__(self):
         return f'{self._client}(host = {self._host}, port = {self._port}, database = {self.database})'
@@ -585,6 +1427,79 @@ class ConnectionPool(object):
 # ***************************************************************************************
 
 
+class AsyncClickHouse(object):
+    """
+    AsyncClickHouse is an asyncio facade of a ClickHouse ConnectionPool.
+
+    clickhouse-driver is a blocking client, each query is executed on a bounded thread pool executor
+    and it is awaited from the event loop. The number of queries in flight is limited to `max_workers`,
+    by default the size of the connection pool, so that queries never wait in the executor for a connection.
+    Queries that are awaited together with `gather` run concurrently on separate pooled connections.
+    """
+    def __init__(self, pool, max_workers=None):
+        """
+        :param pool: ConnectionPool instance connected to ClickHouse
+        :param max_workers: maximum number of concurrent queries, defaults to the size of the connection pool
+        """
+        if pool._client != 'ClickHouse':
+            raise InvalidEngine(f'Failed: AsyncClickHouse requires a ClickHouse connection pool')
+        self._pool = pool
+        self._max_workers = max_workers or pool.pool_size
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='AsyncClickHouse')
+
+    @property
+    def pool(self):
+        return self._pool
+
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    async def run(self, method, *args, **kwargs):
+        """
+        Call a blocking method on the executor without blocking the event loop
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, partial(method, *args, **kwargs))
+
+    async def sql(self, *args, **kwargs):
+        """
+        Execute SQL query on a pooled connection without blocking the event loop, see ClickHouse.sql()
+        Streaming mode is not supported, the result set is returned as a whole
+        """
+        if kwargs.get('stream'):
+            raise InvalidCmdOperation(f'Failed: streaming mode is not supported in AsyncClickHouse.sql()')
+        return await self.run(self._pool.sql, *args, **kwargs)
+
+    async def cmd(self, *args, **kwargs):
+        """
+        Execute TRIADB command on a pooled connection without blocking the event loop, see ClickHouse.cmd()
+        """
+        return await self.run(self._pool.cmd, *args, **kwargs)
+
+    async def gather(self, *queries, **kwargs):
+        """
+        Execute SQL queries concurrently
+        :param queries: SQL query strings
+        :param kwargs: parameters of ClickHouse.sql() that are common to all queries
+        :return: list of results in the same order as the queries
+        """
+        return await asyncio.gather(*[self.sql(query, **kwargs) for query in queries])
+
+    def close(self):
+        """
+        Shutdown the executor, the connection pool is left open
+        """
+        self._executor.shutdown(wait=True)
+
+    def __repr__(self):
+        return f'AsyncClickHouse({self._pool}, max_workers = {self._max_workers})'
+
+# ***************************************************************************************
+# ************************** End of AsyncClickHouse Class ***********************
+# ***************************************************************************************
+
+
 # /\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\
 # ***************************************************************************************
 #                   =======   End of triadb_clients Module =======
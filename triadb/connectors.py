@@ -108,8 +108,8 @@ class DataManagementConnector(ConnectionPool):
     def get_tables(self, engine=None, table=None, exe=True):
         return self.cmd('tables', db=self._datadb, engine=engine, table=table, execute=exe)
 
-    def optimize_parts(self, table, exe=True):
-        return self.cmd('optimize', table=table, execute=exe)
+    def optimize_parts(self, table, exe=True, profile=None):
+        return self.cmd('optimize', table=table, execute=exe, profile=profile)
 
 
 # ===========================================================================================
@@ -137,7 +137,8 @@ class MetaManagementConnector(ConnectionPool):
         :param connect_params: see ConnectionPool
         """
 
-        super().__init__(**connect_params)
+        # Orator models use the API connection, pooled queries run on their own connections
+        super().__init__(reserve_api=True, **connect_params)
         self._dbg = debug
         self._metaclient = self.api    # This is the Orator API
         self._metadb = self.database   # Name of MariaDB database that we store metadata
@@ -147,6 +148,9 @@ class MetaManagementConnector(ConnectionPool):
         self._edges = SchemaEdge(self._metaclient)  # MariaDB database table Edges
         self._setup()
 
+        # In-process snapshot of the metadata graph, DataModelSystem and DataResourceSystem lookups read from it
+        self._snapshot = MetaSnapshot(self)
+
         if self._dbg > 5:
             self._metaclient.connection().enable_query_log()
 
@@ -195,6 +199,17 @@ class MetaManagementConnector(ConnectionPool):
     def metadb(self):
         return self._metadb
 
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def refresh(self):
+        """
+        Refresh the snapshot of the metadata graph, e.g. after metadata have been modified outside `add`
+        :return: the new version of the snapshot
+        """
+        return self._snapshot.refresh()
+
     @property
     def host(self):
         return self._host
@@ -214,6 +229,8 @@ class MetaManagementConnector(ConnectionPool):
     def _setup(self):
         # Set the connection for Orator Models
         Model.set_connection_resolver(self._metaclient)
+        # Lookups of nodes by key run with prepared statements on the pooled connections
+        set_node_pool(self)
 
         # Register Orator Model observers to handle callback events
         RootSystem.observe(RootSystemObserver())
@@ -516,6 +533,9 @@ class MetaManagementConnector(ConnectionPool):
             if self._dbg > 2:
                 print(obj)
 
+        # Metadata graph has changed
+        self._snapshot.refresh()
+
         return obj
 
     def get(self, dim3=None, dim2=None, what=None,
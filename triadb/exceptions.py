@@ -132,4 +132,16 @@ class PandasError(TRIADBError):
 class ClickHouseException(TRIADBError):
     """
         Raised when it fails to execute query in ClickHouse
-    """
\ No newline at end of file
+    """
+
+
+class QueryTimeout(TRIADBError):
+    """
+        Raised when a query exceeds its deadline and it is cancelled in ClickHouse
+    """
+
+
+class PoolTimeout(TRIADBError):
+    """
+        Raised when no connection of the pool becomes available before the checkout timeout
+    """
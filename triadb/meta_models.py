@@ -13,16 +13,232 @@ You should have received a copy of the GNU Affero General Public License along w
 If not, see <https://www.gnu.org/licenses/>.
 """
 
+import threading
 from orator import orm
+from orator.exceptions.orm import ModelNotFound
 from .utils import ETL
 from .exceptions import (WrongDictionaryType)
 
+# Prepared statements of the lookups of nodes by key, i.e. get_node(key=(dim4, dim3, dim2)),
+# they are compiled once for each model class and they run on the pooled connections of MariaDB
+_node_statements = {}
+_node_statements_lock = threading.Lock()
+_node_pool = None
+
 
 def unique_name(d4, d3, d2):
     strkey = '%02d' % d4 + '_' + '%05d' % d3 + '_' + '%04d' % d2
     return strkey
 
 
+def set_node_pool(pool):
+    """
+    :param pool: ConnectionPool to MariaDB that executes the lookups of nodes by key
+    """
+    global _node_pool
+    _node_pool = pool
+    _node_statements.clear()
+
+
+def _get_node_statement(query):
+    # Compile the lookup of the model class with its global scope applied, placeholder objects mark
+    # the positions of the key in the bindings of the statement
+    model = query.get_model()
+    with _node_statements_lock:
+        statement = _node_statements.get(type(model))
+        if statement is None:
+            marks = (object(), object(), object())
+            builder = model.new_query().where('dim4', marks[0]).where('dim3', marks[1]).where('dim2', marks[2])
+            compiled = builder.apply_scopes().get_query().limit(1)
+            bindings = compiled.get_bindings()
+            positions = [next(i for i, b in enumerate(bindings) if b is mark) for mark in marks]
+            statement = _node_statements[type(model)] = (compiled.to_sql(), bindings, positions)
+    return statement
+
+
+def get_node_by_key(query, key):
+    """
+    Lookup a node by key with a prepared statement on the pooled MariaDB connections
+    :param query: orator query builder of the model class
+    :param key: is the triplet (dim4, dim3, dim2) of the object's fields
+    :return: a model object, ModelNotFound is raised if it does not exist
+    """
+    if _node_pool is None:
+        return query.where('dim4', key[0]).where('dim3', key[1]).where('dim2', key[2]).first_or_fail()
+    sql, bindings, positions = _get_node_statement(query)
+    bindings = list(bindings)
+    for pos, dim in zip(positions, key):
+        bindings[pos] = dim
+    rows = _node_pool.sql(sql, bindings)
+    if not rows:
+        raise ModelNotFound(type(query.get_model()))
+    model = query.get_model()
+    return model.hydrate([dict(rows[0])], model.get_connection_name()).first()
+
+
+class MetaSnapshot(object):
+    """
+    MetaSnapshot is a read-through, in-process copy of the metadata graph that is stored in MariaDB.
+    Metadata are tiny and they change rarely, so all the nodes of a data model or a data set are fetched
+    together on the first lookup and kept in memory, indexed by key, alias, parent and attribute->entities.
+
+    The snapshot is versioned, `refresh()` drops all the nodes and increments the version,
+    MetaManagementConnector refreshes the snapshot after every `add` operation.
+    """
+    def __init__(self, mmc):
+        """
+        :param mmc: MetaManagementConnector
+        """
+        self._mmc = mmc
+        self._version = 0
+        self._lock = threading.RLock()
+        self._clear()
+
+    def __repr__(self):
+        return f'MetaSnapshot(version = {self._version}, nodes = {len(self._by_key)})'
+
+    def _clear(self):
+        self._loaded = set()    # (dim4, dim3) of the data models and data sets that are in the snapshot
+        self._models = None     # alias -> DataModel object
+        self._by_key = {}       # (dim4, dim3, dim2) -> node
+        self._by_nid = {}       # nID -> node
+        self._by_alias = {}     # (dim4, dim3, alias) -> node
+        self._children = {}     # nID of the parent -> list of children nodes
+        self._entities = {}     # nID of the attribute -> list of parent entities
+        self._attributes = {}   # nID of the entity -> list of attributes
+
+    @property
+    def version(self):
+        return self._version
+
+    def refresh(self):
+        """
+        Drop all the nodes of the snapshot, they are fetched again from MariaDB on the next lookup
+        :return: the new version of the snapshot
+        """
+        with self._lock:
+            self._clear()
+            self._version += 1
+        return self._version
+
+    def _index(self, nodes):
+        for node in nodes:
+            node = self._by_key.setdefault(node.key, node)
+            self._by_nid[node.nID] = node
+            self._by_alias.setdefault((node.dim4, node.dim3, node.alias), node)
+            if node.dim2 != 0:
+                self._children.setdefault(node.pID, []).append(node)
+
+    def _load_model(self, dim3):
+        dim4 = self._mmc.dms4
+        try:
+            nodes = [DataModel.get_node(key=(dim4, dim3, 0))]
+        except ModelNotFound:
+            nodes = []
+        if nodes:
+            attributes = Attribute.where('dim4', dim4).where('dim3', dim3).order_by('nID').get().all()
+            nodes += Entity.where('dim4', dim4).where('dim3', dim3).order_by('nID').get().all() + attributes
+            self._index(nodes)
+            if attributes:
+                edges = self._mmc.api.table('Edges').where_in('toID', [attr.nID for attr in attributes])
+                for edge in edges.order_by('fromID').order_by('toID').get():
+                    if edge['fromID'] in self._by_nid:
+                        self._entities.setdefault(edge['toID'], []).append(self._by_nid[edge['fromID']])
+                        self._attributes.setdefault(edge['fromID'], []).append(self._by_nid[edge['toID']])
+        self._loaded.add((dim4, dim3))
+
+    def _load_dataset(self, dim3):
+        dim4 = self._mmc.drs4
+        self._index(Node.where('dim4', dim4).where('dim3', dim3).order_by('nID').get().all())
+        self._loaded.add((dim4, dim3))
+
+    def _load(self, dim4, dim3):
+        # Must be called with the lock acquired
+        if (dim4, dim3) not in self._loaded:
+            if dim4 == self._mmc.dms4:
+                self._load_model(dim3)
+            elif dim4 == self._mmc.drs4:
+                self._load_dataset(dim3)
+
+    def get_node(self, key):
+        """
+        :param key: is the triplet (dim4, dim3, dim2) of the node
+        :return: DataModel, Entity, Attribute object of a data model or Node object of a data set,
+                 None if it does not exist
+        """
+        with self._lock:
+            self._load(key[0], key[1])
+            return self._by_key.get(tuple(key))
+
+    def get_alias(self, dim4, dim3, alias):
+        """
+        :return: the node of the data model or data set with the specified alias, None if it does not exist
+        """
+        with self._lock:
+            self._load(dim4, dim3)
+            return self._by_alias.get((dim4, dim3, alias))
+
+    def get_model(self, alias):
+        """
+        :param alias: the alias field of the DataModel object
+        :return: DataModel object, None if it does not exist
+        """
+        with self._lock:
+            if self._models is None:
+                self._models = {obj.alias: obj for obj in DataModel.get_data_models().get().all()}
+            obj = self._models.get(alias)
+            return obj and self.get_node(obj.key)
+
+    def get_children(self, node):
+        """
+        :param node: DataModel, DataSet or Table node
+        :return: list of children nodes, i.e. entities and attributes of a data model, tables of a dataset,
+                 fields of a table
+        """
+        with self._lock:
+            self._load(node.dim4, node.dim3)
+            return list(self._children.get(node.nID, []))
+
+    def get_attribute(self, nid):
+        """
+        :param nid: nID of an Attribute, e.g. the aID of a Field
+        :return: Attribute object, None if it does not exist
+        """
+        with self._lock:
+            if nid not in self._by_nid:
+                try:
+                    attr = Attribute.find_or_fail(nid)
+                except ModelNotFound:
+                    return None
+                self._load(attr.dim4, attr.dim3)
+            return self._by_nid.get(nid)
+
+    def get_entities(self, attr):
+        """
+        :param attr: Attribute object
+        :return: list of the parent entities of the attribute, two entities in the case of junction attributes
+        """
+        with self._lock:
+            self._load(attr.dim4, attr.dim3)
+            return list(self._entities.get(attr.nID, []))
+
+    def get_attributes(self, node, junction=None):
+        """
+        :param node: DataModel or Entity object
+        :param junction: fetch only junction attributes (True) or non-junction attributes (False)
+        :return: list of the attributes of the data model or the entity
+        """
+        with self._lock:
+            self._load(node.dim4, node.dim3)
+            if node.ntype == 'ENT':
+                attributes = self._attributes.get(node.nID, [])
+            else:
+                attributes = [obj for obj in self._children.get(node.nID, []) if obj.ntype == 'ATTR']
+            if junction is not None:
+                attributes = [obj for obj in attributes if bool(obj.junction) == junction]
+            return list(attributes)
+
+
 # ***********************************************************************************************
 # orm.Model observers consolidate the handling of model events
 # Each observer class has methods that correspond to various model events, e.g. a creating callback
@@ -234,7 +450,7 @@ class Node(orm.Model):
         :param key: is the triplet (dim4, dim3, dim2) of the object's fields
         :return: a Node object
         """
-        return query.where('dim4', key[0]).where('dim3', key[1]).where('dim2', key[2]).first_or_fail()
+        return get_node_by_key(query, key)
 
     @orm.scope
     def dms(self, query):
@@ -309,7 +525,7 @@ class Field(orm.Model):
         :param key: is the triplet (dim4, dim3, dim2) of the object's fields
         :return: a Table object
         """
-        return query.where('dim4', key[0]).where('dim3', key[1]).where('dim2', key[2]).first_or_fail()
+        return get_node_by_key(query, key)
 
     # Parent-Children Relationship
     # ONE side (parent of the Field is the Table)
@@ -358,7 +574,7 @@ class Table(orm.Model):
         :param key: is the triplet (dim4, dim3, dim2) of the object's fields
         :return: a Table object
         """
-        return query.where('dim4', key[0]).where('dim3', key[1]).where('dim2', key[2]).first_or_fail()
+        return get_node_by_key(query, key)
 
     # Parent-Children Relationship
     # ONE side (parent of the Table is the DataSet)
@@ -399,7 +615,7 @@ class DataSet(orm.Model):
         :param key: is the triplet (dim4, dim3, dim2) of the object's fields
         :return: a DataSet object
         """
-        return query.where('dim4', key[0]).where('dim3', key[1]).where('dim2', key[2]).first_or_fail()
+        return get_node_by_key(query, key)
 
     @orm.scope
     def get_data_sets(self, query):
@@ -479,7 +695,7 @@ class Attribute(orm.Model):
         :param key: is the triplet (dim4, dim3, dim2) of the object's fields
         :return: an Attribute object
         """
-        return query.where('dim4', key[0]).where('dim3', key[1]).where('dim2', key[2]).first_or_fail()
+        return get_node_by_key(query, key)
 
     @orm.accessor
     def key(self):
@@ -544,7 +760,7 @@ class Entity(orm.Model):
         :param key: is the triplet (dim4, dim3, dim2) of the object's fields
         :return: an Entity object
         """
-        return query.where('dim4', key[0]).where('dim3', key[1]).where('dim2', key[2]).first_or_fail()
+        return get_node_by_key(query, key)
 
     # Parent-Children Relationship
     # ONE side (parent of the Entity is the DataModel)
@@ -599,7 +815,7 @@ class DataModel(orm.Model):
         :param key: is the triplet (dim4, dim3, dim2) of the object's fields
         :return: a DataModel object
         """
-        return query.where('dim4', key[0]).where('dim3', key[1]).where('dim2', key[2]).first_or_fail()
+        return get_node_by_key(query, key)
 
     @orm.scope
     def get_data_models(self, query):
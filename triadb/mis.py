@@ -14,12 +14,14 @@ If not, see <https://www.gnu.org/licenses/>.
 """
 
 import sys
+import time
 
 from .utils import ETL
 from .exceptions import MISError
 from .connectors import MetaManagementConnector, DataManagementConnector
 from .subsystems import DataModelSystem, DataResourceSystem
 from triadb.triaclick import TriaClickEngine
+from .sessions import SessionManager
 
 
 # ===========================================================================================
@@ -29,7 +31,7 @@ class MIS(object):
     """
     MIS is a builder pattern class based on two subsystems DataModelSystem and DataResourceSystem
     """
-    def __init__(self, debug=0, rebuild=False, erase=False, what='meta'):
+    def __init__(self, debug=0, rebuild=False, erase=False, what='meta', timeout=None, session_idle=1800):
         """
         :param erase: set the flag to erase all data (truncate table) from the metadata database
                      (faster than rebuilding the schema) or ClickHouse Database
@@ -39,6 +41,8 @@ class MIS(object):
         :param what: Default `meta`, rebuild or erase MariaDB metadata database
                      `data`, rebuild or erase ClickHouse TriaDB database
                      `all`, rebuild or erase both ClickHouse and MariaDB databases
+        :param timeout: deadline in seconds of interactive queries, e.g. get_items(), get_tuples(), counts
+        :param session_idle: seconds after which an idle user session is closed, see open_session()
         """
         # Initialize connections for frameworks
         self._dbg = debug        # flag to display debug info
@@ -47,6 +51,10 @@ class MIS(object):
         self._drs = None         # Data Resource System
         self._dms = None         # Data Model System
         self._engine = None      # associative semiotic hypergraph engine
+        self._timeout = timeout  # deadline of interactive queries in seconds
+        self._session_idle = session_idle  # maximum idle time of a user session in seconds
+        self._session_manager = None  # engines of user sessions with their own filter states
+        self._restart_elapsed = None  # seconds spent in the last restart(), i.e. the start-up time of the engine
         self.sql = None  # Handler to execute sql commands
 
         # flag to rebuild or not metadata-management framework (mmf) or data-management framework (dmf)
@@ -76,6 +84,39 @@ class MIS(object):
     def engine(self):
         return self._engine
 
+    @property
+    def sessions(self):
+        """
+        :return: SessionManager of the user sessions on the current data model
+        """
+        if self._session_manager is None:
+            if not self._engine:
+                raise MISError('Failed to start sessions, use restart() to set the data model first')
+            self._session_manager = SessionManager(self._dmc, self._dms, self._drs, debug=self._dbg,
+                                                   timeout=self._timeout, max_idle=self._session_idle)
+        return self._session_manager
+
+    def open_session(self, session_id=None):
+        """
+        :param session_id: letters, digits and underscores, a new session id is generated if it is not specified
+        :return: TriaClickEngine with filter states that are isolated from the other sessions
+        """
+        return self.sessions.open(session_id)
+
+    def get_session(self, session_id):
+        return self.sessions.get(session_id)
+
+    def close_session(self, session_id):
+        return self.sessions.close(session_id)
+
+    def set_timeout(self, seconds):
+        """
+        :param seconds: deadline of interactive queries, None to disable it
+        """
+        self._timeout = seconds
+        if self._engine:
+            self._engine.timeout = seconds
+
     def connect_to_datastore(self, **connect_params):
         """
         :param connect_params:
@@ -101,9 +142,15 @@ class MIS(object):
         :param dataset_dim: dim3 dimension of the data set
         :param reset: whether to reset filtering or leave the existing states
         :return: asets
+
+        Notice: ASETs, their counts and the ASERD graph are constructed on first use, not at start-up
         """
+        t_start = time.perf_counter()
         if reset:
             self._dms = None
+            if self._session_manager is not None:
+                self._session_manager.close_all()
+                self._session_manager = None
 
         # Set DataModel
         self.set_dms(model_dim)
@@ -114,7 +161,7 @@ class MIS(object):
 
         # Set Engine
         if not self._engine:
-            self._engine = TriaClickEngine(self._dmc, self._dms, self._drs, self._dbg)
+            self._engine = TriaClickEngine(self._dmc, self._dms, self._drs, self._dbg, timeout=self._timeout)
 
         # Set or Reset Engine
         if reset and self._engine.engines_created:
@@ -123,6 +170,10 @@ class MIS(object):
         if reset and not self._engine.engines_created:
             raise MISError('Reset failed, engines have not been created yet')
 
+        self._restart_elapsed = time.perf_counter() - t_start
+        if self._dbg > 0:
+            print(f'Engine started in {round(self._restart_elapsed, 3)} sec')
+
         return self._engine
 
     def set_dms(self, dim=None, alias=None):
@@ -292,6 +343,38 @@ class MIS(object):
     def count_items(self):
         return self._engine.count_items()
 
+    def get_cache_stats(self):
+        return self._engine.cache_stats
+
+    def get_query_metrics(self, order_by='total_sec', reset=False):
+        """
+        :param order_by: column to sort the metrics in descending order
+        :param reset: clear the metrics after they are returned
+        :return: pandas dataframe with latency percentiles, rows/bytes processed, dataframe conversion time
+                 and errors for each query id
+        """
+        result = self._dmc.metrics.summary(order_by=order_by)
+        if reset:
+            self._dmc.metrics.reset()
+        return result
+
+    def dump_query_metrics(self, fname):
+        return self._dmc.metrics.dump_json(fname)
+
+    @property
+    def restart_elapsed(self):
+        """
+        :return: seconds spent in the last restart(), i.e. the start-up time of the engine
+        """
+        return self._restart_elapsed
+
+    def get_propagation_timings(self):
+        """
+        :return: dictionary of elapsed time in seconds for each edge of the ASERD
+                 that the last filtering was propagated over
+        """
+        return self._engine.propagation_timings
+
     def compare_fields_with_attributes(self, matching_pairs, graph=False):
         return self._engine.compare_fields_with_attributes(matching_pairs, graph=graph)
 
@@ -301,11 +384,49 @@ class MIS(object):
     def add_mapping(self):
         return self._engine.add_mapping()
 
-    def import_data(self):
-        return self._engine.import_data()
+    def import_data(self, **kwargs):
+        """
+        Import the data resources of the data set, in parallel
+        :return: total number of rows imported, the first error of a failed import is raised after all imports finish
+        """
+        return self._engine.import_data(**kwargs)
+
+    def get_import_report(self):
+        """
+        :return: dataframe indexed by table with resource, rows, sec and error of each import in the last import_data()
+        """
+        return self._engine.import_report
+
+    def load_data(self, **kwargs):
+        """
+        Load the imported data on the engines and rebuild the states engine,
+        the open sessions are closed because their filter states refer to the previous data
+        """
+        result = self._engine.load_data(**kwargs)
+        if self._session_manager is not None:
+            self._session_manager.close_all()
+        return result
+
+    def load_delta(self, source, **kwargs):
+        """
+        :param source: path of the delta file when a single data resource is mapped, otherwise
+                       a dictionary of data resource names and paths of their delta files
+        :return: number of rows imported
+        """
+        return self._engine.load_delta(source, **kwargs)
+
+    # Asynchronous query API, queries run concurrently on the ClickHouse connection pool
+    async def aget_items(self, **kwargs):
+        return await self._engine.aget_items(**kwargs)
+
+    async def aget_tuples(self, *dims, **kwargs):
+        return await self._engine.aget_tuples(*dims, **kwargs)
+
+    async def acount_items(self):
+        return await self._engine.acount_items()
 
-    def load_data(self):
-        return self._engine.load_data()
+    async def afilter_selections(self, cql_selections, mode='single'):
+        return await self._engine.afilter_selections(cql_selections, mode=mode)
 
 # ***************************************************************************************
 # ************************** End of MIS Class ***********************
@@ -0,0 +1,143 @@
+"""
+This file is part of TRIADB Self-Service Data Management and Analytics Framework
+(C) 2015-2019 Athanassios I. Hatzis
+
+TRIADB is free software: you can redistribute it and/or modify it under the terms of
+the GNU Affero General Public License v.3.0 as published by the Free Software Foundation.
+
+TRIADB is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with TRIADB.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+import time
+import threading
+from uuid import uuid4
+from collections import OrderedDict
+
+from .exceptions import MISError
+from triadb.triaclick import TriaClickEngine
+
+
+class SessionManager(object):
+    """
+    SessionManager keeps one TriaClickEngine per user session, so that many users can filter the same data model
+    independently. Each session engine writes its filter states in its own tables, i.e. the states table and the
+    FLT_ tables are suffixed with the session id, and the sets of hbonds are kept in memory instead of the Entity rows.
+    Sessions that stay idle longer than `max_idle` seconds are closed and their tables are dropped.
+    """
+    def __init__(self, dmc, dms, drs=None, debug=0, timeout=None, max_idle=1800, max_sessions=None):
+        """
+        :param dmc: DataManagementConnector, i.e. the ClickHouse connection pool that is shared by the sessions
+        :param dms: DataModelSystem of the data model
+        :param drs: DataResourceSystem of the data set
+        :param debug: flag to display debugging messages during execution
+        :param timeout: deadline in seconds of interactive queries
+        :param max_idle: seconds after which an idle session is closed
+        :param max_sessions: maximum number of open sessions, the least recently used one is closed to open a new one
+        """
+        self._dmc = dmc
+        self._dms = dms
+        self._drs = drs
+        self._dbg = debug
+        self._timeout = timeout
+        self._max_idle = max_idle
+        self._max_sessions = max_sessions
+        self._sessions = OrderedDict()     # session id -> (engine, last access time), least recently used first
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return f'SessionManager(sessions = {len(self._sessions)}, max_idle = {self._max_idle})'
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def _touch(self, session_id):
+        # Must be called with the lock acquired
+        engine, _ = self._sessions.pop(session_id)
+        self._sessions[session_id] = (engine, time.monotonic())
+        return engine
+
+    def _close(self, session_id):
+        # Must be called with the lock acquired
+        engine, _ = self._sessions.pop(session_id)
+        try:
+            engine.drop_session()
+        except Exception as e:
+            if self._dbg > 0:
+                print(f'Failed to drop the tables of session {session_id}: {e}')
+        if self._dbg > 1:
+            print(f'Closed session {session_id}')
+        return session_id
+
+    def open(self, session_id=None):
+        """
+        :param session_id: letters, digits and underscores, a new session id is generated if it is not specified
+        :return: the engine of the session, it is created if the session does not exist
+        """
+        with self._lock:
+            self.evict_idle()
+            if session_id is not None and session_id in self._sessions:
+                return self._touch(session_id)
+            session_id = session_id or uuid4().hex[:12]
+            if self._max_sessions and len(self._sessions) >= self._max_sessions:
+                self._close(next(iter(self._sessions)))
+            engine = TriaClickEngine(self._dmc, self._dms, self._drs, self._dbg,
+                                     timeout=self._timeout, session=session_id)
+            self._sessions[session_id] = (engine, time.monotonic())
+            if self._dbg > 1:
+                print(f'Opened session {session_id}')
+            return engine
+
+    def get(self, session_id):
+        """
+        :param session_id: id of an open session
+        :return: the engine of the session
+        """
+        with self._lock:
+            self.evict_idle()
+            if session_id not in self._sessions:
+                raise MISError(f'Session <{session_id}> does not exist or it has expired')
+            return self._touch(session_id)
+
+    def close(self, session_id):
+        """
+        Close the session and drop its filter state tables
+        :param session_id: id of an open session
+        """
+        with self._lock:
+            if session_id not in self._sessions:
+                raise MISError(f'Session <{session_id}> does not exist or it has expired')
+            return self._close(session_id)
+
+    def close_all(self):
+        with self._lock:
+            return [self._close(session_id) for session_id in list(self._sessions)]
+
+    def evict_idle(self):
+        """
+        Close the sessions that stay idle longer than `max_idle` seconds
+        :return: list of the closed session ids
+        """
+        with self._lock:
+            now = time.monotonic()
+            expired = [session_id for session_id, (_, access_time) in self._sessions.items()
+                       if now - access_time > self._max_idle]
+            return [self._close(session_id) for session_id in expired]
+
+    @property
+    def sessions(self):
+        """
+        :return: dictionary of idle time in seconds for each open session
+        """
+        with self._lock:
+            now = time.monotonic()
+            return {session_id: round(now - access_time, 3)
+                    for session_id, (_, access_time) in self._sessions.items()}
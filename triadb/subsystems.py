@@ -19,7 +19,6 @@ If not, see <https://www.gnu.org/licenses/>.
 from .meta_models import Entity
 from .utils import ETL
 from .exceptions import DataResourceSystemError, DataModelSystemError
-from orator.exceptions.orm import ModelNotFound
 
 # ===========================================================================================
 # DataModelSystem objects and operations
@@ -160,36 +159,23 @@ class DataModelSystem(object):
         :return: the DataModelSystem object
         """
         obj = None
+        # Lookups read from the in-process snapshot of the metadata graph, see MetaSnapshot
+        snapshot = self._mmc.snapshot
 
         if dim3 and dim2 == 0:
-            try:
-                obj = self._mmc.get(dim3, what='model')
-            except ModelNotFound:
-                pass
+            obj = snapshot.get_node((self._mmc.dms4, dim3, 0))
 
         elif dim3 is None and dim2 is None and alias:
-            try:
-                obj = self._mmc.get(alias=alias, what='model')
-            except ModelNotFound:
-                pass
+            obj = snapshot.get_model(alias)
 
         elif dim3 and dim2 is None and alias:
-            try:
-                obj = self._mmc.get(dim3, what='entity', alias=alias)
-            except ModelNotFound:
-                try:
-                    obj = self._mmc.get(dim3, what='attribute', alias=alias)
-                except ModelNotFound:
-                    pass
+            # alias is unique within the data model, i.e. an Entity or an Attribute
+            obj = snapshot.get_alias(self._mmc.dms4, dim3, alias)
+            if obj is not None and obj.ntype not in ['ENT', 'ATTR']:
+                obj = None
 
         elif dim3 and dim2 != 0:
-            try:
-                obj = self._mmc.get(dim3, dim2, what='entity')
-            except ModelNotFound:
-                try:
-                    obj = self._mmc.get(dim3, dim2, what='attribute')
-                except ModelNotFound:
-                    pass
+            obj = snapshot.get_node((self._mmc.dms4, dim3, dim2))
 
         elif dim3 is None and dim2 is None and alias is None:
             self._key = 'NEW'
@@ -211,7 +197,7 @@ class DataModelSystem(object):
             self._hatbl_flt = self._hatbl + 'States'
             self._hatom_states = f'HAtom_{self._dict.dim3}States'  # HAtom table name in filtered state
             if self._type == 'ATTR':
-                self.parents = self._mmc.get(self.dim3, self.dim2, what='entities', out='objects', junction=True)
+                self.parents = snapshot.get_entities(self._dict)
 
         return self
 
@@ -304,6 +290,9 @@ class DataModelSystem(object):
         return self._mmc.get(what='models', **kwargs)
 
     def get_entities(self, **kwargs):
+        if kwargs == {'out': 'objects'} and self.type == 'DM':
+            # Entities of the data model are read from the snapshot of the metadata graph
+            return [obj for obj in self._mmc.snapshot.get_children(self._dict) if obj.ntype == 'ENT']
         if 'out' not in kwargs and 'select' not in kwargs:
             kwargs['select'] = 'dim4, dim3, dim2, cname, alias, ntype, ctype, counter'
         return self._mmc.get(self.dim3, what='entities', **kwargs)
@@ -313,6 +302,10 @@ class DataModelSystem(object):
         :param kwargs:
         :return: attributes in the specified format
         """
+        if kwargs.get('out') == 'objects' and set(kwargs) <= {'out', 'junction'} and self.type in ['DM', 'ENT']:
+            # Attributes of the data model or the entity are read from the snapshot of the metadata graph
+            return self._mmc.snapshot.get_attributes(self._dict, junction=kwargs.get('junction'))
+
         if 'out' not in kwargs and 'select' not in kwargs:
             kwargs['select'] = 'dim4, dim3, dim2, cname, alias, ntype, vtype, junction, descr'
             kwargs['extras'] = 'fields, entities'
@@ -395,6 +388,8 @@ class DataResourceSystem(object):
 
     @property
     def imported(self):
+        if self._imported is None and self._type == 'TBL':
+            self._imported = self._check_import()
         return self._imported
 
     @imported.setter
@@ -404,6 +399,8 @@ class DataResourceSystem(object):
 
     @property
     def loaded(self):
+        if self._engines_created is None and self._type == 'TBL':
+            self._engines_created = self._check_engines()
         return self._engines_created
 
     @property
@@ -445,11 +442,13 @@ class DataResourceSystem(object):
         :param dim2: table/field dimension
         :return:
         """
-        # Check if key exists in the metadata dictionary
+        # Check if key exists in the snapshot of the metadata dictionary
         key = (dim3, dim2)
         try:
-            obj = self._mmc.get(what='node', key=(self._mmc.drs4, dim3, dim2))
+            obj = self._mmc.snapshot.get_node((self._mmc.drs4, dim3, dim2))
         except Exception:
+            obj = None
+        if obj is None:
             raise DataResourceSystemError(f'Object with key {key} is not found')
 
         # Check the node type
@@ -464,8 +463,9 @@ class DataResourceSystem(object):
         if self._type == 'TBL':
             self._tbl = f'DAT_{self._dict.dim3}_{self._dict.dim2}'
             self._entity_key = self.check_mapping()
-            self._imported = self._check_import()
-            self._engines_created = self._check_engines()
+            # Existence of ClickHouse tables is checked on first access, see `imported`, `loaded` properties
+            self._imported = None
+            self._engines_created = None
         else:
             # That covers the case that we switch from a TBL object to some other dictionary object
             self._entity_key = ()
@@ -475,7 +475,7 @@ class DataResourceSystem(object):
 
     def _check_engines(self):
         # a prerequisite to check engines is to check mapping first
-        if self.check_mapping():
+        if self._entity_key:
             # it checks if HAtom table engine has been created
             # if true it assumes that HLink and Data Dictionary engines are also present because
             # these are all created from ``create_engines`` method
@@ -514,14 +514,15 @@ class DataResourceSystem(object):
                 assigning an Entity key for each data resource
         """
         entity_key = ()
-        for field in self.get_fields(out='objects'):
-            attrib = field.attribute
+        snapshot = self._mmc.snapshot
+        for field in snapshot.get_children(self._dict):
+            attrib = snapshot.get_attribute(field.aID) if field.aID else None
             # If the field is not mapped
             if not attrib:
                 pass
             # If the field is mapped to a non-junction attribute
             elif not attrib.junction:
-                entity_key = attrib.entities.all()[0].key
+                entity_key = snapshot.get_entities(attrib)[0].key
                 break
         return entity_key
 
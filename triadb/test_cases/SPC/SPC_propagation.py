@@ -0,0 +1,39 @@
+"""
+TRIADB-TriaClick Demo with Supplier-Part-Catalog (SPC) DataModel/DataSet
+Propagation of filtering to the associated ASETs
+
+(C) October 2019 By Athanassios I. Hatzis
+"""
+from triadb import MIS
+
+mis = MIS(debug=0)
+
+mis.connect_to_datastore(dbms='clickhouse', host='localhost', port=9000,
+                         user='demo', password='demo', database='TriaDB', trace=0)
+
+mis.connect_to_metastore(dbms='mariadb', host='localhost', port=3306,
+                         user='demo', password='demo', database='TRIADB', trace=0)
+
+eng = mis.restart(200, reset=True)
+
+# Filter Part ASET, then Catalog ASET, the filtering of Catalog propagates back to Part and Supplier
+eng.filter_selections(eng.set_hacol(alias='p_color').cql.Select().Where("$v='Red'"))
+eng.filter_selections(eng.set_hacol(alias='c_price').cql.Select().Where('$v<20'))
+
+catalog, part, supplier = eng.get_aset(12), eng.get_aset(7), eng.get_aset(1)
+for aset in [part, supplier]:
+    # HBonds of the propagation targets are counted from their filtered set
+    assert aset.filtered
+    assert aset.hbonds == eng.chsql(f'SELECT count() FROM {aset.old_set}', qid='Count filtered set')[0][0]
+    # Propagation leaves the same state as filtering, i.e. VW_pos views and positive states
+    assert aset._is_filtered()
+    pos = eng.chsql(f'SELECT count() FROM {eng.states_table} FINAL WHERE hb2={aset.key[1]} AND pos=1',
+                    qid='Count positive states')[0][0]
+    assert pos > 0
+
+# Selected states of Part survive the propagation from Catalog
+sel = eng.chsql(f'SELECT count() FROM {eng.states_table} FINAL WHERE hb2={part.key[1]} AND sel=1',
+                qid='Count selected states')[0][0]
+assert sel > 0
+
+eng.restart()
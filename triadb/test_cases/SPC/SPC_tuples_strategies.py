@@ -0,0 +1,46 @@
+"""
+TRIADB-TriaClick Demo with Supplier-Part-Catalog (SPC) DataModel/DataSet
+Tuple reconstruction strategies, rows of the imported data resource and HLink engine, return the same tuples
+
+(C) October 2019 By Athanassios I. Hatzis
+"""
+from triadb import MIS
+
+mis = MIS(debug=0)
+
+mis.connect_to_datastore(dbms='clickhouse', host='localhost', port=9000,
+                         user='demo', password='demo', database='TriaDB', trace=0)
+
+mis.connect_to_metastore(dbms='mariadb', host='localhost', port=3306,
+                         user='demo', password='demo', database='TRIADB', trace=0)
+
+eng = mis.restart(200, 242, reset=True)
+
+catalog = eng.get_aset(12)
+dims = [eng.set_hacol(alias=alias).dim2 for alias in ['c_price', 'c_quantity', 'c_date', 'c_check']]
+attrs = [eng._create_dms_attr(dim) for dim in dims]
+
+# The data resource of Catalog is imported, `auto` selects the rows strategy
+assert eng._tuples_strategy(attrs, catalog.key[1])[0] == 'rows'
+
+
+def compare_strategies():
+    rows = mis.get_tuples(*dims, aset_dim2=catalog.key[1], hb1=True, strategy='rows').sort_values('hb1')
+    hlink = mis.get_tuples(*dims, aset_dim2=catalog.key[1], hb1=True, strategy='hlink').sort_values('hb1')
+    rows, hlink = rows.reset_index(drop=True), hlink.reset_index(drop=True)
+    assert rows.shape == hlink.shape
+    # Missing values are NULL in both strategies
+    assert rows.isnull().equals(hlink.isnull())
+    assert rows.astype(str).equals(hlink.astype(str))
+    return rows
+
+
+# Unfiltered state
+compare_strategies()
+
+# Filtered state
+eng.filter_selections(eng.set_hacol(alias='c_price').cql.Select().Where('$v<20'))
+tuples = compare_strategies()
+assert len(tuples) == catalog.hbonds
+
+eng.restart()
@@ -2,14 +2,16 @@
 TRIADB Modules Testing:
     creating instance of triadb.clients.ConnectionPool
     testing connection to database management systems (ClickHouse, MariaDB)
+    testing concurrent queries on a pool of ClickHouse connections
 
 (C) October 2019 By Athanassios I. Hatzis
 """
+from concurrent.futures import ThreadPoolExecutor
 from triadb import ConnectionPool
 
 # Test Connections
 chcon = ConnectionPool(dbms='clickhouse', host='localhost', port=9000,
-                       user='demo', password='demo', database='TriaDB', trace=4)
+                       user='demo', password='demo', database='TriaDB', trace=4, pool_size=4)
 chsql = chcon.sql
 chcmd = chcon.cmd
 
@@ -23,3 +25,28 @@ print(chsql('SHOW DATABASES'))
 # Test MariaDB Client
 print(list(mysql('SHOW TABLES')))
 
+# Test concurrent queries on pooled ClickHouse connections
+with ThreadPoolExecutor(max_workers=4) as executor:
+    futures = [executor.submit(chsql, 'SELECT sleep(1)', qid='Sleep') for _ in range(8)]
+    [future.result() for future in futures]
+print(chcon.pool_stats)
+
+# Test checkout timeout, the only connection of the pool is busy
+from triadb.exceptions import PoolTimeout
+onecon = ConnectionPool(dbms='clickhouse', host='localhost', port=9000,
+                        user='demo', password='demo', database='TriaDB', pool_size=1, checkout_timeout=0.5)
+busy = onecon.checkout()
+try:
+    onecon.checkout()
+    raise AssertionError('PoolTimeout is not raised')
+except PoolTimeout as e:
+    print(e)
+finally:
+    onecon.checkin(busy)
+
+# Test MariaDB pool of the metastore, pooled queries do not share the connection of Orator models
+from triadb.connectors import MetaManagementConnector
+mmc = MetaManagementConnector(dbms='mariadb', host='localhost', port=3306,
+                              user='demo', password='demo', database='TRIADB')
+with mmc.connection() as con:
+    assert con._api is not mmc.api
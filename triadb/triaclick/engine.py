@@ -7,32 +7,50 @@ The files subject to TOSLA are grouped in this directory to clearly separate the
 in the parent directory that are licensed under GNU Affero General Public License v.3.0.
 You should retain this header in the file and a copy of the LICENSE_TOSLA file in the current directory
 """
+import os
+import re
 import time
+import asyncio
+import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor,as_completed
+from datetime import date,datetime
 
-from triadb.exceptions import DataResourceSystemError, MISError
+from triadb.clients import AsyncClickHouse
+from triadb.exceptions import DataResourceSystemError, MISError, ClickHouseException, QueryTimeout
 from triadb.meta_models import Attribute, Field
 from triadb.utils import ETL, highlight_states
 from triadb.subsystems import DataModelSystem
 
-from.hgraph import ASERD,HGPyDot
+from.hgraph import ASERD
 from.hacol import HACOL,HACQL
 from.haset import ASET
 class TriaClickEngine(object):
- def __init__(self,dmc,dms,drs,debug):
+ def __init__(self,dmc,dms,drs,debug,timeout=None,session=None):
+  if session is not None and not re.fullmatch(r'[A-Za-z0-9_]+',str(session)):
+   raise MISError(f'Invalid session id <{session}>, use only letters, digits and underscores')
+  self._session=session 
   self._mapping_pairs=[]
+  self._timeout=timeout 
   self._dbg=debug 
   self._hacol=None 
   self._asets={} 
+  self._hacols={} 
   self._aserd=None 
   self._dmc=dmc 
   self._dms=dms 
   self._drs=drs 
   self.chsql=dmc.sql
   self.chcmd=dmc.cmd
+  self.chpipe=dmc.pipeline
+  self._aclient=None 
+  self._afilter_lock=None 
+  self._propagation_timings=OrderedDict()
+  self._import_report=None
+  self._states_partitions=None
   engines_created=self.chsql(f'EXISTS table HAtom_{self._dms.key[0]}',qid='ExistsHAtom')[0][0]
-  if engines_created:
-   self.set_asets()
-   self.set_aserd()
+  if engines_created and self._session:
+   self._create_session_states()
  def __repr__(self):
   return f'TriaClickEngine(\n\t{self._mmc}, \n\t{self._dmc}  )'
  @property
@@ -59,10 +77,22 @@ class TriaClickEngine(object):
   return self._dms.hatable
  @property
  def _hatable_flt(self):
+  if self._session:
+   return f'{self._dms.hatable_flt}_{self._session}'
   return self._dms.hatable_flt
  @property
  def _hatable_states(self):
-  return self._dms.hatable_states
+  return self._hatable_flt
+ @property
+ def states_table(self):
+  return self._hatable_flt
+ @property
+ def session(self):
+  return self._session
+ def flt_prefix(self,dim3,dim2):
+  if self._session:
+   return f'FLT_{dim3}_{dim2}_{self._session}'
+  return f'FLT_{dim3}_{dim2}'
  @property
  def _drs_node(self):
   return self._drs.node
@@ -85,14 +115,25 @@ class TriaClickEngine(object):
  def _loaded(self):
   return self._drs.loaded
  @property
+ def timeout(self):
+  return self._timeout
+ @timeout.setter
+ def timeout(self,seconds):
+  self._timeout=seconds
+ @property
  def hacol(self):
   return self._hacol
  @property
  def asets(self):
-  d={(self._dms3,ent.dim2):self._create_aset(ent.dim2)for ent in self._dms.get_entities(out='objects')}
-  return d
+  if not self._asets:
+   self.set_asets()
+  return{key:aset for key,aset in self._asets.items()if isinstance(key,tuple)}
+ def find_aset(self,dim3,dim2):
+  return self._asets.get((dim3,dim2))
  @property
  def aserd(self):
+  if self._aserd is None:
+   self.set_aserd()
   return self._aserd
  def _get_table_name(self,engine_short_name):
   tbl=None
@@ -120,6 +161,8 @@ class TriaClickEngine(object):
  def get_table_engines(self,engine=None,table=None,exe=True):
   return self._dmc.get_tables(engine=engine,table=table,exe=exe)
  def get_aset(self,dim2=None,alias=None):
+  if not self._asets:
+   self.set_asets()
   if alias:
    result=self._asets[alias]
   elif dim2:
@@ -127,9 +170,9 @@ class TriaClickEngine(object):
   else:
    raise MISError(f'Cannot return Associative Entity Set (ASET), check parameters')
   return result
- def get_rows(self,aset_dim2=None,projection=None,pandas_columns=None,group_by=None,limit=10,offset=0,order_by=None,index=None,exe=True):
+ def get_rows(self,aset_dim2=None,projection=None,pandas_columns=None,group_by=None,limit=10,offset=0,order_by=None,index=None,exe=True,stream=False,chunk_rows=65536):
   if aset_dim2:
-   filter_query=f'SELECT * FROM {self.get_aset(aset_dim2).ent.old_set}'
+   filter_query=f'SELECT * FROM {self.get_aset(aset_dim2).old_set}'
   else:
    filter_query=None
   if not self._imported or self._drs.type!='TBL':
@@ -155,9 +198,9 @@ class TriaClickEngine(object):
   if not pandas_columns:
    pandas_columns=projection
   if index:
-   pandas_df=self.chsql(sql,cols=pandas_columns,index=index,qid='SelectRows',execute=exe)
+   pandas_df=self.chsql(sql,cols=pandas_columns,index=index,qid='SelectRows',execute=exe,stream=stream,chunk_rows=chunk_rows,profile='interactive',timeout=self._timeout)
   else:
-   pandas_df=self.chsql(sql,cols=pandas_columns,qid='SelectRows',execute=exe)
+   pandas_df=self.chsql(sql,cols=pandas_columns,qid='SelectRows',execute=exe,stream=stream,chunk_rows=chunk_rows,profile='interactive',timeout=self._timeout)
   return pandas_df
  def get_rows_from_external_resource(self,projection=None,where=None,limit=None,exe=True):
   if self._drs.type!='TBL':
@@ -190,7 +233,69 @@ class TriaClickEngine(object):
    raise DataResourceSystemError(f'Failed: DataResource must have container type  <ctype in TSV, CSV, MYSQL>')
   result=self.chcmd(cmd='select',source=container_type,dbhost=host,dbport=port,dbuser=user,dbpassword=pwd,db=dbase,table=dbtable,fullpath=fp,heading=structure,fields=pandas_columns,projection=projection,where=where,limit=limit,execute=exe)
   return result
- def get_tuples(self,*dims,aset_dim2,projection=None,group_by=None,limit=None,offset=0,order_by=None,pandas_columns=None,index=None,exe=True,hb2=False,hb1=False):
+ def _tuples_tables(self,attrs,aset_dim2):
+  tables=[]
+  if self._drs is None:
+   return tables
+  snapshot=self._mmc.snapshot
+  dataset=snapshot.get_node((self._mmc.drs4,self._drs3,0))
+  for tbl in(snapshot.get_children(dataset)if dataset else[]):
+   if tbl.ntype!='TBL':
+    continue
+   mapped=[snapshot.get_attribute(fld.aID)for fld in snapshot.get_children(tbl)if fld.aID]
+   mapped=[attr for attr in mapped if attr]
+   entity_keys=[snapshot.get_entities(attr)[0].key for attr in mapped if not attr.junction]
+   if not entity_keys or entity_keys[0][2]!=aset_dim2:
+    continue
+   aliases=[attr.alias for attr in mapped]
+   if all(attr.alias in aliases for attr in attrs):
+    tables.append(f'DAT_{tbl.dim3}_{tbl.dim2}')
+  return tables
+ def _imported_table(self,tables):
+  # '' when none of the tables is imported, None stands for a table that is not resolved yet
+  for table in tables:
+   if self.chsql(f'EXISTS TABLE {table}',qid='ExistsDAT')[0][0]:
+    return table
+  return ''
+ def _tuples_strategy(self,attrs,aset_dim2,strategy='auto',table=None):
+  if table is None and strategy in['auto','rows']:
+   table=self._imported_table(self._tuples_tables(attrs,aset_dim2))
+  if strategy=='auto':
+   strategy='rows' if table else 'hlink'
+  return strategy,table
+ def _tuples_from_rows(self,attrs,aset_dim2,table,hb2=False,hb1=False):
+  if not table:
+   raise MISError(f'Operation failed, there is not an imported data resource of ASET {aset_dim2} with all the attributes')
+  aset=self.get_aset(aset_dim2)
+  sel=f'SELECT {", ".join([attr.alias for attr in attrs])}'
+  if hb2:
+   sel+=f', {aset_dim2} AS hb2'
+  if hb1:
+   sel+=', rowno AS hb1'
+  whe=f'\nWHERE rowno IN {aset.old_set}' if aset.filtered else ''
+  return f'{sel}\nFROM {table}{whe}'
+ def _tuples_from_hlink(self,attrs,aset_dim2,hb2=False,hb1=False):
+  aset=self.get_aset(aset_dim2)
+  keys=', '.join([f'anyIf(toUInt32(ha1+1), ha2={attr.dim2}) AS k{attr.dim2}' for attr in attrs])
+  whe=f'WHERE hb2={aset_dim2} AND ha2 IN ({", ".join([str(attr.dim2) for attr in attrs])})'
+  if aset.filtered:
+   whe+=f' AND hb1 IN {aset.old_set}'
+  sql_query=f'SELECT hb1, {keys}\nFROM {self._hltable}\n{whe}\nGROUP BY hb1'
+  columns=['hb1']+[f'k{attr.dim2}' for attr in attrs]
+  for attr in attrs:
+   dictionary=f'SELECT toUInt32(ha1+1) AS k{attr.dim2}, val AS v{attr.dim2}\nFROM HAtom_{self._dms3}_{attr.vtype}\nWHERE ha2={attr.dim2}'
+   if attr.node.junction:
+    dictionary+=f' AND hb2={aset_dim2}'
+   sql_query=f'SELECT {", ".join(columns)}, v{attr.dim2}\nFROM\n({sql_query})\nANY LEFT JOIN\n({dictionary})\nUSING k{attr.dim2}'
+   columns.append(f'v{attr.dim2}')
+  # k=0 when the hyperbond has no value for the attribute, it is NULL as in the rows of the data resource
+  sel=f'SELECT {", ".join([f"if(k{attr.dim2}=0, NULL, v{attr.dim2}) AS {attr.alias}" for attr in attrs])}'
+  if hb2:
+   sel+=f', {aset_dim2} AS hb2'
+  if hb1:
+   sel+=', hb1'
+  return f'{sel}\nFROM\n({sql_query})'
+ def _tuples_from_join(self,*dims,aset_dim2,hb2=False,hb1=False):
   sel_projection,sel,frm,fjn,sql_query,cnt,cntcolumns='','','','','',0,len(dims)
   for dim in dims:
    cnt+=1
@@ -217,27 +322,47 @@ class TriaClickEngine(object):
     frm=f'\nFROM\n\n({sql_query})'
     fjn=f'\n\nFULL JOIN\n\n({hlinksq})\n\nUSING hb1'
     sql_query=sel+frm+fjn
+  return sql_query
+ def _tuples_query(self,*dims,aset_dim2,projection=None,group_by=None,limit=None,offset=0,order_by=None,pandas_columns=None,hb2=False,hb1=False,strategy='auto',table=None):
+  if strategy not in['auto','rows','hlink','join']:
+   raise MISError(f'Operation failed, unknown tuple reconstruction strategy <{strategy}>')
+  attrs=[self._create_dms_attr(dim)for dim in dims]
+  strategy,table=self._tuples_strategy(attrs,aset_dim2,strategy=strategy,table=table)
+  if strategy=='rows':
+   sql_query,hb1_order=self._tuples_from_rows(attrs,aset_dim2,table,hb2=hb2,hb1=hb1),'rowno'
+  elif strategy=='hlink':
+   sql_query,hb1_order=self._tuples_from_hlink(attrs,aset_dim2,hb2=hb2,hb1=hb1),'hb1'
+  else:
+   sql_query,hb1_order=self._tuples_from_join(*dims,aset_dim2=aset_dim2,hb2=hb2,hb1=hb1),None
+  if self._dbg>1:
+   print(f'Tuple reconstruction strategy: {strategy}')
+  sel_projection=', '.join([attr.alias for attr in attrs])
   if group_by:
    sql_query=f'SELECT {projection} \nFROM\n({sql_query}) \nGROUP BY {group_by}'
   if order_by:
    sql_query+=f'\nORDER BY {order_by}'
+  elif hb1_order and not group_by:
+   sql_query+=f'\nORDER BY {hb1_order}'
   if limit:
    sql_query+=f'\nLIMIT {limit} OFFSET {offset}'
   if not pandas_columns:
-   pandas_columns=f'{sel_projection[:-2]}'
+   pandas_columns=sel_projection
    if hb2:
     pandas_columns+=', hb2'
    if hb1:
     pandas_columns+=', hb1'
+  return sql_query,pandas_columns
+ def get_tuples(self,*dims,aset_dim2,projection=None,group_by=None,limit=None,offset=0,order_by=None,pandas_columns=None,index=None,exe=True,hb2=False,hb1=False,stream=False,chunk_rows=65536,strategy='auto'):
+  sql_query,pandas_columns=self._tuples_query(*dims,aset_dim2=aset_dim2,projection=projection,group_by=group_by,limit=limit,offset=offset,order_by=order_by,pandas_columns=pandas_columns,hb2=hb2,hb1=hb1,strategy=strategy)
   if exe:
    if index:
-    result=self.chsql(sql_query,cols=pandas_columns,index=index)
+    result=self.chsql(sql_query,cols=pandas_columns,index=index,qid='SelectTuples',stream=stream,chunk_rows=chunk_rows,profile='interactive',timeout=self._timeout)
    else:
-    result=self.chsql(sql_query,cols=pandas_columns)
+    result=self.chsql(sql_query,cols=pandas_columns,qid='SelectTuples',stream=stream,chunk_rows=chunk_rows,profile='interactive',timeout=self._timeout)
   else:
    result=sql_query
   return result
- def get_items(self,dim2=None,aset_dim2=None,alias=None,projection=None,limit=None,order_by=None,excluded=None,exe=True,index=None,highlight=True,caption=None):
+ def _items_cql(self,dim2=None,aset_dim2=None,alias=None,projection=None,limit=None,order_by=None,excluded=None):
   hacol=None
   if aset_dim2:
    parent_entity=self.get_aset(aset_dim2).ent
@@ -251,7 +376,7 @@ class TriaClickEngine(object):
   if not order_by:
    orderstr='$c DESC, $v DESC'
   if not projection:
-   if hacol._is_filtered():
+   if hacol.filtered:
     projection='$v, $c, $s, $p'
    else:
     projection='$v, $c'
@@ -259,19 +384,26 @@ class TriaClickEngine(object):
    obj=hacol.cql.Over(projection,excluded=excluded).Order(orderstr).Limit(limit)
   else:
    obj=hacol.cql.Over(projection,excluded=excluded).Order(orderstr)
-  if index:
-   pandas_df=obj.Exe(index=index,exe=exe).Res
-  else:
-   pandas_df=obj.Exe(exe=exe).Res
+  return hacol,obj
+ def _style_items(self,hacol,pandas_df,highlight,caption,filtered=None):
   if not caption:
    caption=hacol.attrib.name
-  if hacol._is_filtered()and highlight:
+  if filtered is None:
+   filtered=highlight and hacol.filtered
+  if filtered and highlight:
    result=pandas_df.style. apply(highlight_states,axis=1). set_table_attributes("style='display:inline'"). set_caption(caption)
   elif highlight:
    result=pandas_df.style. set_table_attributes("style='display:inline'"). set_caption(caption)
   else:
    result=pandas_df
   return result
+ def get_items(self,dim2=None,aset_dim2=None,alias=None,projection=None,limit=None,order_by=None,excluded=None,exe=True,index=None,highlight=True,caption=None):
+  hacol,obj=self._items_cql(dim2,aset_dim2,alias,projection,limit,order_by,excluded)
+  if index:
+   pandas_df=obj.Exe(index=index,exe=exe).Res
+  else:
+   pandas_df=obj.Exe(exe=exe).Res
+  return self._style_items(hacol,pandas_df,highlight,caption)
  def get_selections(self):
   return{aset:self.get_aset(dim2=k[1]).get_selections()for k,aset in self.asets.items()}
  def count_items(self):
@@ -293,28 +425,68 @@ class TriaClickEngine(object):
   structure2=['ha2 UInt16','ha1 UInt32','cnt UInt32','hb2 UInt16','hb1arr Array(UInt32)']
   self.chcmd(cmd='create',table=self._hatable,heading=structure2,engine='MergeTree',partkey='ha2',skey='(hb2, ha2, ha1)',settings='old_parts_lifetime = 30',execute=exe)
   return exe
+ @property
+ def _hatable_template(self):
+  return f'{self._dms.hatable_flt}Template'
+ def get_states_partitions(self,hb2=None):
+  if self._states_partitions is None:
+   parts=self.get_parts(table=self._hatable_template)
+   self._states_partitions=sorted(set(parts.index.values))if parts is not None else[]
+  if hb2 is None:
+   return self._states_partitions
+  return[prtid for prtid in self._states_partitions if prtid.startswith(f'{hb2}-')]
+ def _reset_states_plan(self,*hb2s):
+  part_ids=self.get_states_partitions()if not hb2s else[prtid for hb2 in hb2s for prtid in self.get_states_partitions(hb2)]
+  return[(f"""ALTER TABLE {self._hatable_flt} REPLACE PARTITION ID '{prtid}' FROM {self._hatable_template}""",f'Reset states of Partition ID {prtid}',())for prtid in part_ids]
+ def _create_states_template(self,exe=True):
+  self.chsql(f'DROP TABLE IF EXISTS {self._hatable_template}',qid='Drop States template',execute=exe)
+  self.chsql(f'CREATE TABLE {self._hatable_template} AS {self._dms.hatable_flt}',qid='Create States template',execute=exe)
+  self.chsql(f'INSERT INTO {self._hatable_template}\nSELECT hb2, [] AS hb1arr, 0 AS cnt, ha2, ha1, 0 AS pos, 0 AS sel FROM {self._hatable}',qid='Insert States template',execute=exe,profile='load')
+  self._dmc.optimize_parts(table=self._hatable_template,exe=exe,profile='load')
+  self._states_partitions=None
+  return self._hatable_template
  def _reset_states_engine(self):
-  self.chsql(f'\nALTER TABLE {self._hatable_states} DROP COLUMN hb1arr',qid='Drop column hb1arr')
-  self.chsql(f'ALTER TABLE {self._hatable_states} ADD COLUMN hb1arr Array(UInt32) DEFAULT [] AFTER hb2',qid='Add column hb1arr')
-  self.chsql(f'\nALTER TABLE {self._hatable_states} DROP COLUMN cnt',qid='Drop column cnt')
-  self.chsql(f'ALTER TABLE {self._hatable_states} ADD COLUMN cnt UInt32 DEFAULT 0 AFTER hb1arr',qid='Add column cnt')
-  self.chsql(f'\nALTER TABLE {self._hatable_states} DROP COLUMN pos',qid='Drop column pos')
-  self.chsql(f'ALTER TABLE {self._hatable_states} ADD COLUMN pos UInt8 DEFAULT 0 AFTER ha1',qid='Add column pos')
-  self.chsql(f'ALTER TABLE {self._hatable_states} DROP COLUMN sel',qid='Drop column sel')
-  self.chsql(f'ALTER TABLE {self._hatable_states} ADD COLUMN sel UInt8 DEFAULT 0 AFTER pos',qid='Add column sel')
+  if not self.chsql(f'EXISTS TABLE {self._hatable_template}',qid='ExistsStatesTemplate')[0][0]:
+   self._create_states_template()
+  return self.chpipe(self._reset_states_plan(),profile='filter')
+ def _create_session_states(self):
+  if not self.chsql(f'EXISTS TABLE {self._hatable_template}',qid='ExistsStatesTemplate')[0][0]:
+   self._create_states_template()
+  self.chsql(f'CREATE TABLE IF NOT EXISTS {self._hatable_flt} AS {self._hatable_template}',qid='Create session States')
+  return self.chpipe(self._reset_states_plan(),profile='filter')
+ def drop_session(self):
+  if not self._session:
+   raise MISError('Operation failed, the shared filter states can be dropped only with a rebuild of the engines')
+  for key,aset in self._asets.items():
+   if isinstance(key,tuple):
+    aset.drop_states()
+  self.chsql(f'DROP TABLE IF EXISTS {self._hatable_flt}',qid='Drop session States')
+  return self._session
  def create_states_engine(self,exe=True):
   hatom_heading=['hb2 UInt16','hb1arr Array(UInt32)','cnt UInt32','ha2 UInt16','ha1 UInt32']
   self.chcmd(cmd='create',table=self._hatable_flt,heading=hatom_heading,engine='ReplacingMergeTree',partkey='(hb2, ha2)',skey='(hb2, ha2, ha1)',settings='old_parts_lifetime = 30',execute=exe)
-  self.chcmd(cmd='insert',source='TableEngine',table=self._hatable_flt,fields=['hb2','hb1arr','cnt','ha2','ha1'],sql=self._hatable,execute=exe)
+  self.chcmd(cmd='insert',source='TableEngine',table=self._hatable_flt,fields=['hb2','hb1arr','cnt','ha2','ha1'],sql=self._hatable,execute=exe,profile='load')
   self.chsql(f'ALTER TABLE {self._hatable_flt} ADD COLUMN pos UInt8 DEFAULT 0 AFTER ha1',qid='AddColumn',execute=exe)
-  self.chsql(f'ALTER TABLE {self._hatable_flt} ADD COLUMN sel UInt8 DEFAULT 0 AFTER ha1',qid='AddColumn',execute=exe)
+  self.chsql(f'ALTER TABLE {self._hatable_flt} ADD COLUMN sel UInt8 DEFAULT 0 AFTER pos',qid='AddColumn',execute=exe)
   self.optimize_parts('hatomStates',exe=exe)
+  self._create_states_template(exe=exe)
   return self._hatable_flt
+ def _drop_session_states(self,exe=True):
+  # states and FLT tables of the sessions are copies of the previous template, they are dropped when it is rebuilt
+  base=self._dms.hatable_flt
+  tables=[name for name, in self.chsql(f"SELECT name FROM system.tables WHERE database=currentDatabase() AND startsWith(name, '{base}_')",qid='Session States tables')if name!=self._hatable_flt]
+  for table in tables:
+   session=table[len(base)+1:]
+   flt_tables=self.chsql(f"SELECT name FROM system.tables WHERE database=currentDatabase() AND match(name, '^FLT_{self._dms3}_[0-9]+_{session}_(VW_pos|VW_sel|MEM_X|MEM_Z|MEM_ha1)$') ORDER BY engine='View' DESC",qid='Session FLT tables')
+   for name, in flt_tables+[(table,)]:
+    self.chsql(f'DROP TABLE IF EXISTS {name}',qid='Drop session table',execute=exe)
+  return tables
  def _rebuild_states_engine(self,exe=True):
   t_start=time.time()
   if self._dbg>0:
    print('\n┃▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔ STARTED ▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔┃')
   hatom_table=self.create_states_engine(exe=exe)
+  self._drop_session_states(exe=exe)
   t_stop=time.time()
   if self._dbg>0:
    print(f'Rebuild of states engine {hatom_table} is completed:')
@@ -338,10 +510,10 @@ class TriaClickEngine(object):
   vtypes=set(vtypes)
   for vtype in vtypes:
    hatom_structure=['ha2','ha1','hb2','arrayJoin(hb1arr) hb1']
-   self.chcmd(cmd='insert',source='DataTypeDictionary',table=f'HLink_{model_dim}',fields=hatom_structure,sql=f'HAtom_{model_dim}_{vtype}',execute=exe)
+   self.chcmd(cmd='insert',source='DataTypeDictionary',table=f'HLink_{model_dim}',fields=hatom_structure,sql=f'HAtom_{model_dim}_{vtype}',execute=exe,profile='load')
   for vtype in vtypes:
    hatom_structure=['ha2','ha1','cnt','hb2','hb1arr']
-   self.chcmd(cmd='insert',source='DataTypeDictionary',table=f'HAtom_{model_dim}',fields=hatom_structure,sql=f'HAtom_{model_dim}_{vtype}',execute=exe)
+   self.chcmd(cmd='insert',source='DataTypeDictionary',table=f'HAtom_{model_dim}',fields=hatom_structure,sql=f'HAtom_{model_dim}_{vtype}',execute=exe,profile='load')
   '''
         SELECT [ha2, ha1] AS ha,
                 groupArray([hb2, hb1]) AS hbs
@@ -349,40 +521,71 @@ class TriaClickEngine(object):
         GROUP BY ha2, ha1 order by ha;
         '''  
   return exe
- def _get_hyperatom_adjacency_lists(self,attr_alias,exe=False):
+ def _get_hyperatom_adjacency_lists(self,attr_alias,exe=False,where=None):
   structure=[f'{attr_alias} val','toUInt32(count(*)) cnt',f'toUInt16({self._entity_key[2]}) hb2','groupArray(rowno) hb1arr']
   column_names=['val','cnt','hb2','hb1arr']
-  result=self.chcmd(cmd='select',source='ImportedDataResource',table=self._table_name,heading=structure,fields=column_names,execute=exe)
+  result=self.chcmd(cmd='select',source='ImportedDataResource',table=self._table_name,heading=structure,fields=column_names,where=where,execute=exe)
   return result
  def _load_datatype_dictionary(self,fld,exe=True):
   modeldim=fld.attribute.dim3
   attrdim=fld.attribute.dim2
   dtype=fld.attribute.vtype
   alias=fld.attribute.alias
-  attr_exists=None
-  if fld.attribute.junction:
-   attr_exists_query=f'''
-            SELECT toUInt16({attrdim}) IN 
-            (SELECT ha2 FROM HAtom_{modeldim}_{dtype} GROUP BY ha2 ) AS attr_exists
-            '''   
-   attr_exists=self.chsql(attr_exists_query,cols='attr_exists',qid='AttributeExists',execute=True).values[0][0]
   select_cmd=self._get_hyperatom_adjacency_lists(alias,exe=False)
-  if attr_exists==1:
+  if self._junction_attribute_exists(fld):
    colnames=['ha2','ha1','A.val','A.cnt','A.hb2','A.hb1arr']
    source_param='ImportedDataResourceWithRightJoin'
   else:
    colnames=[f'toUInt16({attrdim}) AS ha2','toUInt32(rowNumberInAllBlocks()) AS ha1','val','cnt','hb2','hb1arr']
    source_param='ImportedDataResource'
-  self.chcmd(cmd='insert',source=source_param,table=f'HAtom_{modeldim}_{dtype}',fields=colnames,ha2=attrdim,sql=select_cmd,execute=exe)
+  self.chcmd(cmd='insert',source=source_param,table=f'HAtom_{modeldim}_{dtype}',fields=colnames,ha2=attrdim,sql=select_cmd,execute=exe,profile='load')
+  return exe
+ def _junction_attribute_exists(self,fld):
+  if not fld.attribute.junction:
+   return False
+  attr_exists_query=f'''
+            SELECT toUInt16({fld.attribute.dim2}) IN 
+            (SELECT ha2 FROM HAtom_{fld.attribute.dim3}_{fld.attribute.vtype} GROUP BY ha2 ) AS attr_exists
+            '''   
+  return self.chsql(attr_exists_query,cols='attr_exists',qid='AttributeExists',execute=True).values[0][0]==1
+ def _load_datatype_dictionaries(self,flds,exe=True):
+  modeldim=flds[0].attribute.dim3
+  dtype=flds[0].attribute.vtype
+  attrs=', '.join([f'(toUInt16({fld.attribute.dim2}), {fld.attribute.alias})' for fld in flds])
+  query=f'''
+INSERT INTO HAtom_{modeldim}_{dtype} (ha2, ha1, val, cnt, hb2, hb1arr)
+SELECT ha2, toUInt32(ha1-1) AS ha1, item.1 AS val, item.2 AS cnt, hb2, item.3 AS hb1arr
+FROM
+(SELECT ha2, any(hb2) AS hb2, arraySort(groupArray((val, cnt, hb1arr))) AS items
+ FROM
+ (SELECT attr.1 AS ha2, attr.2 AS val, toUInt32(count(*)) AS cnt, toUInt16({self._entity_key[2]}) AS hb2, groupArray(rowno) AS hb1arr
+  FROM {self._table_name}
+  ARRAY JOIN [{attrs}] AS attr
+  GROUP BY ha2, val
+  HAVING isNotNull(val))
+ GROUP BY ha2)
+ARRAY JOIN items AS item, arrayEnumerate(items) AS ha1
+'''
+  self.chsql(query,qid=f'Insert adjacency lists into HAtom_{modeldim}_{dtype}',execute=exe,profile='load')
   return exe
- def _load_dictionaries(self,exe=True):
+ def _load_dictionaries(self,exe=True,single_scan=True):
   if not self._imported:
    raise DataResourceSystemError(f'DataResource DRS:{self._drs.type}:{self._drs.key} is not imported')
   if not self._loaded:
    raise DataResourceSystemError(f'Data model engines must be initialized first')
-  for field in self._drs.get_fields(out='objects'):
-   if field.attribute:
+  flds=[field for field in self._drs.get_fields(out='objects')if field.attribute]
+  if not single_scan:
+   for field in flds:
     self._load_datatype_dictionary(field,exe=exe)
+   return exe
+  vtypes={}
+  for field in flds:
+   if self._junction_attribute_exists(field):
+    self._load_datatype_dictionary(field,exe=exe)
+   else:
+    vtypes.setdefault(field.attribute.vtype,[]).append(field)
+  for vtype_flds in vtypes.values():
+   self._load_datatype_dictionaries(vtype_flds,exe=exe)
   return exe
  def _initialize_process(self):
   if not self._drs.type=='DS' and self._drs.ctype not in['MYSQL','CSV','TSV']:
@@ -397,13 +600,13 @@ class TriaClickEngine(object):
   if self._dbg>0:
    print('\n┃▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔ STARTED ▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔┃')
   return objlist
- def load_data(self,exe=True):
+ def load_data(self,exe=True,single_scan=True):
   t_start=time.time()
   objlist=self._initialize_process()
   self._create_engines()
   for obj in objlist:
    self._drs.switch(obj.key[1],obj.key[2])
-   self._load_dictionaries(exe=exe)
+   self._load_dictionaries(exe=exe,single_scan=single_scan)
    t_loading_dres=time.time()
    if self._dbg>1:
     print('Loading data from data resource into dictionaries is finished:')
@@ -427,11 +630,95 @@ class TriaClickEngine(object):
    print(f'Elapsed: {round(t_stop-t_start, 3)} sec')
    print('\n⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗ FINISHED LOADING ⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗')
   self._rebuild_states_engine()
+  self._asets,self._hacols={},{}
+  self.bump_epoch()
  def optimize_parts(self,engine_shortname,exe=True):
   tbl_name=self._get_table_name(engine_shortname)
-  return self._dmc.optimize_parts(table=tbl_name,exe=exe)
+  return self._dmc.optimize_parts(table=tbl_name,exe=exe,profile='load')
  def rebuild_hypergraph_engines(self):
   pass
+ def _get_next_rowno(self):
+  return self.chsql(f'SELECT if(count()=0, 0, max(rowno)+1) FROM {self._table_name}',qid='NextRowNo')[0][0]
+ def _load_delta_dictionary(self,fld,offset,exe=True):
+  dim3,attrdim,hb2,alias=fld.attribute.dim3,fld.attribute.dim2,self._entity_key[2],fld.attribute.alias
+  dictionary=f'HAtom_{dim3}_{fld.attribute.vtype}'
+  delta,staging=f'{dictionary}_Delta',f'{self._hatable}_Delta'
+  delta_query=self._get_hyperatom_adjacency_lists(alias,exe=False,where=f'rowno >= {offset}')
+  delta_vals=f'(SELECT {alias} FROM {self._table_name} WHERE rowno >= {offset})'
+  self.chsql(f'DROP TABLE IF EXISTS {delta}',qid='Drop delta of DataTypeDictionary',execute=exe)
+  self.chsql(f'''
+CREATE TABLE {delta} ENGINE = Memory AS
+SELECT toUInt16({attrdim}) AS ha2,
+       if(H.found=1, H.ha1, toUInt32((SELECT max(ha1) FROM {dictionary} WHERE ha2={attrdim})+1+rowNumberInAllBlocks())) AS ha1,
+       val, D.cnt+O.cnt AS cnt, D.hb2 AS hb2, arrayConcat(O.hb1arr, D.hb1arr) AS hb1arr, O.bonded AS bonded
+FROM
+({delta_query}) AS D
+LEFT JOIN
+(SELECT val, any(ha1) AS ha1, toUInt8(1) AS found FROM {dictionary} FINAL WHERE ha2={attrdim} AND val IN {delta_vals} GROUP BY val) AS H
+USING val
+LEFT JOIN
+(SELECT val, cnt, hb1arr, toUInt8(1) AS bonded FROM {dictionary} FINAL WHERE ha2={attrdim} AND hb2={hb2} AND val IN {delta_vals}) AS O
+USING val
+''',qid='Merge delta of DataTypeDictionary',execute=exe,profile='load')
+  self.chsql(f'INSERT INTO {dictionary} (ha2, ha1, val, cnt, hb2, hb1arr)\nSELECT ha2, ha1, val, cnt, hb2, hb1arr FROM {delta}',qid='Insert delta into DataTypeDictionary',execute=exe,profile='load')
+  self.chsql(f'INSERT INTO {self._hltable}\nSELECT ha2, ha1, hb2, arrayJoin(arrayFilter(x -> x >= {offset}, hb1arr)) AS hb1 FROM {delta}',qid='Append delta into HLink',execute=exe,profile='load')
+  self.chsql(f'DROP TABLE IF EXISTS {staging}',qid='Drop HAtom staging',execute=exe)
+  self.chsql(f'CREATE TABLE {staging} AS {self._hatable}',qid='Create HAtom staging',execute=exe)
+  self.chsql(f'''
+INSERT INTO {staging}
+SELECT ha2, ha1, cnt, hb2, hb1arr FROM {self._hatable} WHERE ha2={attrdim} AND (hb2, ha1) NOT IN (SELECT hb2, ha1 FROM {delta})
+UNION ALL
+SELECT ha2, ha1, cnt, hb2, hb1arr FROM {delta}
+''',qid='Insert delta into HAtom staging',execute=exe,profile='load')
+  self.chsql(f'ALTER TABLE {self._hatable} REPLACE PARTITION {attrdim} FROM {staging}',qid='Replace HAtom partition',execute=exe,profile='load')
+  # a value is new for this entity when it has no row with this hb2, e.g. a junction value of another entity
+  for table in[self._hatable_template,self._hatable_flt]:
+   self.chsql(f'INSERT INTO {table} (hb2, hb1arr, cnt, ha2, ha1, pos, sel)\nSELECT hb2, [] AS hb1arr, 0 AS cnt, ha2, ha1, 0 AS pos, 0 AS sel FROM {delta} WHERE bonded=0',qid='Insert new HAtoms into States',execute=exe,profile='load')
+  self.chsql(f'DROP TABLE IF EXISTS {staging}',qid='Drop HAtom staging',execute=exe)
+  self.chsql(f'DROP TABLE IF EXISTS {delta}',qid='Drop delta of DataTypeDictionary',execute=exe)
+  self._states_partitions=None
+ def load_delta(self,source,exe=True,block_size=65536):
+  t_start=time.time()
+  if not self.engines_created:
+   raise MISError(f'Incremental loading failed, engines have not been created yet, use load_data() first')
+  objlist=self._initialize_process()
+  if not isinstance(source,dict)and len(objlist)!=1:
+   raise MISError(f'Incremental loading failed, DataSet has {len(objlist)} data resources mapped, ' f'source must be a dictionary of data resource names and paths of delta files')
+  total_rows=0
+  for obj in objlist:
+   self._drs.switch(obj.key[1],obj.key[2])
+   path=source.get(self._drs.name)if isinstance(source,dict)else source
+   if not path:
+    continue
+   offset=self._get_next_rowno()
+   cnt=self._import(exe=exe,block_size=block_size,offset=offset,path=path)
+   total_rows+=cnt
+   for field in self._drs.get_fields(out='objects'):
+    if field.attribute:
+     self._load_delta_dictionary(field,offset,exe=exe)
+   aset=self.find_aset(self._dms3,self._entity_key[2])
+   if aset is not None:
+    aset.hbonds=None
+   if self._dbg>1:
+    print('Incremental loading of data resource finished:')
+    print(self._drs)
+    print(f'Imported {cnt} rows from row number {offset}')
+    print(f'Elapsed: {round(time.time()-t_start, 3)} sec')
+    print('▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄')
+  self._drs.switch(self._drs3,0)
+  if exe and any(aset.filtered for aset in self._asets.values()):
+   # filtered sets do not include the new rows, filtering starts again
+   self.restart()
+  else:
+   self.bump_epoch()
+  t_stop=time.time()
+  if self._dbg>0:
+   print(f'\nIncremental loading of data set is completed:')
+   print(self._drs)
+   print(f'Total rows imported: {total_rows}')
+   print(f'Elapsed: {round(t_stop-t_start, 3)} sec')
+   print('\n⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗ FINISHED INCREMENTAL LOADING ⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗')
+  return total_rows
  '''
     ###############################################################################################################
                 <----------------- Methods for Mapping DataResources on a DataModel ---------------> 
@@ -451,6 +738,7 @@ class TriaClickEngine(object):
    rows.append([fld_id,fld_cname,attr_id,attr_alias])
   columns=['fld_key','fld_nam','attr_key','attr_alias']
   if graph:
+   from.hgpydot import HGPyDot
    pydot_graph=HGPyDot.pydot_bipartite(gseperation=0.2,nseperation=0.6,left_label='Fields',left_nodes=left_ids,left_nlabels=left_labels,right_label='Attributes',right_nodes=right_ids,right_nlabels=right_labels)
    result=pydot_graph.bipartite_mapping(matching_pairs).draw()
   else:
@@ -467,49 +755,113 @@ class TriaClickEngine(object):
    fld,attr=Field.find(fld_id),Attribute.find(attr_id)
    fld.attribute().associate(attr)
    fld.save()
+  self._mmc.refresh()
   return self._drs.check_mapping()
  '''
     ###############################################################################################################
                    <----------------- Methods for Importing DataResources ---------------> 
     ###############################################################################################################
     ''' 
- def _create_import_engine(self,exe=True):
-  structure=['impdate Date','rowno UInt32']+ [f'{obj.attribute.alias} Nullable({obj.attribute.vtype})' for obj in self._drs.get_fields(out='objects')if obj.attribute]
-  return self.chcmd(cmd='create',table=self._table_name,heading=structure,engine='MergeTree',partkey='impdate',skey='(impdate, rowno)',settings='old_parts_lifetime = 30',execute=exe)
- def _import(self,exe=True):
+ def _get_import_structure(self):
+  return['impdate Date','rowno UInt32']+ [f'{obj.attribute.alias} Nullable({obj.attribute.vtype})' for obj in self._drs.get_fields(out='objects')if obj.attribute]
+ def _create_import_engine(self,exe=True,table_name=None,structure=None):
+  structure=structure or self._get_import_structure()
+  return self.chcmd(cmd='create',table=table_name or self._table_name,heading=structure,engine='MergeTree',partkey='impdate',skey='(impdate, rowno)',settings='old_parts_lifetime = 30',execute=exe,profile='load')
+ @staticmethod
+ def _get_value_converter(vtype):
+  if vtype.startswith('UInt')or vtype.startswith('Int'):
+   conv=int
+  elif vtype.startswith('Float'):
+   conv=float
+  elif vtype=='Date':
+   conv=lambda v:datetime.strptime(v[:10],'%Y-%m-%d').date()
+  else:
+   conv=str
+  return lambda v:None if v is None or v=='' else conv(v)
+ def _get_local_table(self,local_root,offset=0,path=None):
+  if self._drs.ctype not in['TSV','CSV']:
+   raise DataResourceSystemError(f'Failed: DataResource must have container type  <ctype in TSV, CSV> for local import')
+  fields=[obj for obj in self._drs.get_fields(out='objects')if obj.attribute]
+  table=ETL.get_table(source=os.path.join(local_root or '',path or self._drs_node.path),rownumbers=False)
+  table=table.cut(*[fld.cname for fld in fields]).rename({fld.cname:fld.attribute.alias for fld in fields})
+  for fld in fields:
+   table=table.convert(fld.attribute.alias,self._get_value_converter(fld.attribute.vtype))
+  table=table.addrownumbers(start=offset,field='rowno').addfield('impdate',date.today())
+  return table,['impdate','rowno']+[fld.attribute.alias for fld in fields]
+ def _import_job(self,exe=True,local_root=None,block_size=65536,offset=None,path=None):
   if not self._entity_key:
    raise DataResourceSystemError(f'DataResource DRS:{self._drs.type}:{self._drs.key} is not mapped onto a data model')
-  select_from_file_cmd=self.get_rows_from_external_resource(exe=False)
-  self._create_import_engine(exe=exe)
-  colnames=['today()','rowNumberInAllBlocks()']+ [f'{obj.attribute.alias}' for obj in self._drs.get_fields(out='objects')if obj.attribute]
-  self.chcmd(cmd='insert',source='file',table=self._table_name,fields=colnames,sql=select_from_file_cmd,execute=exe)
+  table_name=self._table_name
+  create=None
+  if offset is None:
+   structure=self._get_import_structure()
+   create=lambda:self._create_import_engine(exe=exe,table_name=table_name,structure=structure)
+  if local_root or path:
+   data,colnames=self._get_local_table(local_root,offset=offset or 0,path=path)
+   def insert():
+    result=self.chcmd(cmd='insert',source='PETL',table=table_name,fields=colnames,data=data,block_size=block_size,execute=exe,profile='load')
+    return result if exe else 0
+  else:
+   select_from_file_cmd=self.get_rows_from_external_resource(exe=False)
+   rowno='rowNumberInAllBlocks()' if offset is None else f'rowNumberInAllBlocks()+{offset}'
+   colnames=['today()',rowno]+ [f'{obj.attribute.alias}' for obj in self._drs.get_fields(out='objects')if obj.attribute]
+   def insert():
+    self.chcmd(cmd='insert',source='file',table=table_name,fields=colnames,sql=select_from_file_cmd,execute=exe,profile='load')
+    return self._dmc.qstats[3]
+  def job():
+   if create:
+    create()
+   return insert()
+  return job
+ def _import(self,exe=True,local_root=None,block_size=65536,offset=None,path=None):
+  cnt=self._import_job(exe=exe,local_root=local_root,block_size=block_size,offset=offset,path=path)()
   self._imported=True
-  return self._dmc.qstats[3]
- def import_data(self,exe=True):
+  return cnt
+ def _timed_import(self,job):
+  t_start=time.perf_counter()
+  cnt=job()
+  return cnt,time.perf_counter()-t_start
+ def import_data(self,exe=True,local_root=None,block_size=65536,max_workers=None):
   t_start=time.time()
-  total_rows=0 
   objlist=self._initialize_process()
-  cnt=0
+  report=[]
+  errors=[]
+  jobs={}
   for obj in objlist:
    self._drs.switch(obj.key[1],obj.key[2])
-   cnt=self._import(exe=exe)
-   total_rows+=cnt
-   if self._dbg>1:
-    t_split=time.time()
-    print('Importing data from data resource finished:')
-    print(self._drs)
-    print(f'Imported {cnt} rows')
-    print(f'Elapsed: {round(t_split-t_start, 3)} sec')
-    print('▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄')
+   name,table=self._drs.name,self._table_name
+   try:
+    jobs[table]=(name,self._import_job(exe=exe,local_root=local_root,block_size=block_size))
+   except Exception as e:
+    errors.append(e)
+    report.append((table,name,0,0.0,repr(e)))
   self._drs.switch(self._drs3,0)
+  with ThreadPoolExecutor(max_workers=max_workers or self._dmc.pool_size)as executor:
+   futures={executor.submit(self._timed_import,job):table for table,(name,job)in jobs.items()}
+   for future in as_completed(futures):
+    table=futures[future]
+    name,_=jobs[table]
+    try:
+     cnt,elapsed=future.result()
+     report.append((table,name,cnt,elapsed,None))
+    except Exception as e:
+     errors.append(e)
+     report.append((table,name,0,0.0,repr(e)))
+    if self._dbg>1:
+     print(f'Importing data resource {name} into {table} finished: {report[-1][2]} rows, 'f'{round(report[-1][3], 3)} sec' +(f', FAILED with {report[-1][4]}' if report[-1][4] else ''))
+  # report of the last import, one row per data resource, the imported flag is rechecked lazily after each switch
+  self._import_report=result=pd.DataFrame(report,columns=['table','resource','rows','sec','error']).set_index('table')
   if self._dbg>0:
    t_split=time.time()
    print(f'\nImporting data from data set is completed:')
    print(self._drs)
-   print(f'Total rows imported: {total_rows}')
+   print(f'Total rows imported: {result.rows.sum()}')
+   print(f'Failed imports     : {result.error.notnull().sum()}')
    print(f'Total time elapsed : {round(t_split-t_start, 3)} sec')
    print('\n⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗ FINISHED IMPORTING DATA ⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗⫗')
-  return cnt
+  if errors:
+   raise errors[0]
+  return int(result.rows.sum())
  '''
     ###############################################################################################################
                 <----------------- Methods for creating and setting ASETs, HACOL, etc.. ---------------> 
@@ -523,17 +875,31 @@ class TriaClickEngine(object):
   dms_entity=DataModelSystem(self._mmc,dim3=self._dms3,dim2=dim2,debug=self._dbg)
   return ASET(self,dms_entity)
  def set_asets(self):
-  self._asets={(ent.dim3,ent.dim2):self._create_aset(ent.dim2)for ent in self._dms.get_entities(out='objects')}
-  self._asets.update({aset.ent.alias:aset for(key,aset)in self._asets.items()})
-  self.set_aserd()
-  result=[self._asets[(ent.dim3,ent.dim2)]for ent in self._dms.get_entities(out='objects')]
+  self._hacols={}
+  self._aserd=None
+  result=[self._create_aset(ent.dim2)for ent in self._dms.get_entities(out='objects')]
+  self._asets={aset.key:aset for aset in result}
+  self._asets.update({aset.alias:aset for aset in result})
   return result
+ def bump_epoch(self):
+  self._dmc.bump_epoch()
+  for hacol in self._hacols.values():
+   hacol.invalidate()
+ @property
+ def cache_stats(self):
+  return self._dmc.cache_stats
+ @property
+ def import_report(self):
+  return self._import_report
+ @property
+ def propagation_timings(self):
+  return OrderedDict((qid,elapsed)for qid,elapsed in self._propagation_timings.items()if qid.startswith('Propagate'))
  def restart(self):
   self._reset_states_engine()
+  self.bump_epoch()
   result=[]
   if not self._asets:
    self.set_asets()
-   self.set_aserd()
   for ent in self._dms.get_entities(out='objects'):
    aset=self._asets[(ent.dim3,ent.dim2)]
    aset.reset()
@@ -543,33 +909,93 @@ class TriaClickEngine(object):
   dms_attr=DataModelSystem(self._mmc,dim3=self._dms3,dim2=dim2,alias=alias,debug=dbg)
   return dms_attr
  def set_hacol(self,dim2=None,alias=None,dms_entity=None):
-  dms_attribute=self._create_dms_attr(dim2,alias,self._dbg)
-  if dms_entity:
-   self._hacol=HACOL(self,dms_attribute,pentity=dms_entity.node)
-  else:
-   self._hacol=HACOL(self,dms_attribute)
+  key=(dim2,alias,dms_entity.dim2 if dms_entity else None)
+  hacol=self._hacols.get(key)
+  if hacol is None or(dim2 and hacol.dim2!=dim2)or(alias and hacol.alias!=alias):
+   dms_attribute=self._create_dms_attr(dim2,alias,self._dbg)
+   if dms_entity:
+    hacol=HACOL(self,dms_attribute,pentity=dms_entity.node)
+   else:
+    hacol=HACOL(self,dms_attribute)
+   self._hacols[key]=hacol
+  self._hacol=hacol
   return self._hacol
  '''
     ###############################################################################################################
                 <----------------- Methods for Associative Filtering ---------------> 
     ###############################################################################################################
     ''' 
- def _create_junction_attribute_set(self,flt_aset,jattr_dim2):
-  ju_hacol=self.set_hacol(jattr_dim2,dms_entity=flt_aset.ent)
-  ju_query=ju_hacol.cql.Over('$1',excluded=False).Exe(exe=False).Res
-  junction_memory_engine=f'{flt_aset.flt_prefix}_MEM_ha1'
-  self.chsql(f'\nDROP TABLE IF EXISTS {junction_memory_engine}')
-  self.chsql(f'CREATE TABLE {junction_memory_engine} ( ha1 UInt32 ) ENGINE = Memory')
-  self.chsql(f'INSERT INTO {junction_memory_engine}\n{ju_query}')
-  return junction_memory_engine
- def _filter_successor(self,flt_aset,successor_aset,junction_attr_key,):
-  attrib_dim2=junction_attr_key[1]
-  junction_memory_engine=self._create_junction_attribute_set(flt_aset,attrib_dim2)
-  successor_hacol=self.set_hacol(attrib_dim2,dms_entity=successor_aset.ent)
-  successor_sel=successor_hacol.cql.Select().Where(f'ha1 IN {junction_memory_engine}')
-  successor_aset.add_selections(successor_sel)
-  successor_aset.cql.Filter(mode='single',propagate=True).Exe()
-  successor_aset.del_selections(-1)
+ @staticmethod
+ def _hbonds_column(memory_engine):
+  return 'hbz' if memory_engine.endswith('_MEM_Z')else 'hbx'
+ def _propagation_plan(self,start_aset):
+  sets={start_aset.key[1]:start_aset.old_set}
+  inserts={}
+  plan,targets=[],[]
+  for head_node_key,tail_node_key,edge_key in self.aserd.get_bfs_edges(start_aset.key[1]):
+   head_aset,tail_aset=self._asets[head_node_key],self._asets[tail_node_key]
+   head_dim2,tail_dim2,attrib_dim2=head_aset.key[1],tail_aset.key[1],edge_key[1]
+   new_set=tail_aset.new_set
+   semi_join=f'''
+SELECT hb1
+FROM {self._hltable}
+WHERE hb2={tail_dim2} AND ha2={attrib_dim2} AND ha1 IN
+(SELECT ha1 FROM {self._hltable} WHERE hb2={head_dim2} AND ha2={attrib_dim2} AND hb1 IN {sets[head_dim2]})'''
+   if tail_aset.filtered:
+    semi_join+=f' AND hb1 IN {tail_aset.old_set}'
+   drop_qid,create_qid,insert_qid=f'Drop {new_set}',f'Create {new_set}',f'Propagate {head_aset.alias} -> {tail_aset.alias}'
+   plan.append((f'DROP TABLE IF EXISTS {new_set}',drop_qid,()))
+   plan.append((f'CREATE TABLE {new_set} ( {self._hbonds_column(new_set)} UInt32 ) ENGINE = Memory',create_qid,(drop_qid,)))
+   plan.append((f'INSERT INTO {new_set}{semi_join}',insert_qid,(create_qid,)+tuple(inserts.get(head_dim2,()))))
+   sets[tail_dim2]=new_set
+   inserts[tail_dim2]=(insert_qid,)
+   targets.append(tail_aset)
+  return plan,targets,inserts
+ def _propagation_states(self,targets,after):
+  plan=self._reset_states_plan(*[aset.key[1] for aset in targets])
+  reset_qids=tuple(qid for _,qid,_ in plan)
+  for aset in targets:
+   prefix,alias=aset.flt_prefix,aset.alias
+   plan.append((f'DROP TABLE IF EXISTS {prefix}_VW_pos',f'Drop VW_pos of {alias}',()))
+   plan.append((f'''
+CREATE VIEW {prefix}_VW_pos AS
+SELECT any(hb2) AS hb2, groupArray(hb1) AS hb1arr, count() AS cnt, ha2, ha1, 1 AS pos, 0 AS sel
+FROM
+(
+SELECT *
+FROM {self._hltable}
+WHERE hb2={aset.key[1]} AND hb1 IN {aset.new_set})
+GROUP BY ha2, ha1
+ORDER BY ha2, ha1
+''',f'Create VW_pos of {alias}',(f'Drop VW_pos of {alias}',)+after[aset.key[1]]))
+   plan.append((f'INSERT INTO {self._hatable_flt} (hb2, hb1arr, cnt, ha2, ha1, pos, sel)\nSELECT * FROM {prefix}_VW_pos',f'Insert VW_pos of {alias} into HAtom_States',reset_qids+(f'Create VW_pos of {alias}',)))
+   if aset.selectops:
+    sel_query='\nUNION ALL'.join([elem.Exe(exe=False).Res[1]for elem in aset.selectops])
+    plan.append((f'DROP TABLE IF EXISTS {prefix}_VW_sel',f'Drop VW_sel of {alias}',()))
+    plan.append((f'CREATE VIEW {prefix}_VW_sel AS {sel_query}',f'Create VW_sel of {alias}',(f'Drop VW_sel of {alias}',)))
+    plan.append((f'INSERT INTO {self._hatable_flt} (hb2, hb1arr, cnt, ha2, ha1, pos, sel)\nSELECT * FROM {prefix}_VW_sel',f'Insert VW_sel of {alias} into HAtom_States',(f'Create VW_sel of {alias}',f'Insert VW_pos of {alias} into HAtom_States')))
+  return plan
+ def _propagate(self,start_aset,exe=True,max_workers=None):
+  plan,targets,inserts=self._propagation_plan(start_aset)
+  self._propagation_timings=OrderedDict()
+  if not targets:
+   return targets
+  plan+=self._propagation_states(targets,after=inserts)
+  if not exe:
+   return plan
+  timings=self.chpipe(plan,max_workers=max_workers,profile='filter')
+  self._propagation_timings=timings
+  if self._dbg>1:
+   for query_id,elapsed in timings.items():
+    print(f'{query_id}: {round(elapsed, 3)} sec')
+  dfcnt=self.chsql('\nUNION ALL\n'.join([f'SELECT toUInt16({aset.key[1]}) AS hb2, count() AS cnt FROM {aset.new_set}' for aset in targets]),qid='Counting')
+  counts=dict(map(tuple,dfcnt.values))if dfcnt is not None else{}
+  for aset in targets:
+   aset.old_set,aset.new_set=aset.new_set,aset.old_set
+   aset.filtered=True
+   aset.hbonds=counts.get(aset.key[1],0)
+  self.bump_epoch()
+  return targets
  def _get_aset_from_selection(self,selection):
   ent=selection.hacol.pentity
   aset=self.get_aset(ent.dim2)
@@ -579,8 +1005,7 @@ class TriaClickEngine(object):
   if self._dbg>0:
    print('\n┃▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔ STARTED ▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔┃')
   start_aset.cql.Filter(mode=mode).Exe()
-  for head_node_key,tail_node_key,edge_key in self.aserd.get_bfs_edges(start_aset.key[1]):
-   self._filter_successor(self._asets[head_node_key],self._asets[tail_node_key],edge_key)
+  self._propagate(start_aset)
   t_stop=time.time()
   if self._dbg>0:
    print('▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄')
@@ -634,5 +1059,58 @@ class TriaClickEngine(object):
   else:
    sel=hacol.cql.Select().Where(expr)
   return self.filter_selections(sel)
-
-
+ '''
+    ###############################################################################################################
+                <----------------- Asynchronous Query API ---------------> 
+    ###############################################################################################################
+    ''' 
+ @property
+ def aclient(self):
+  if self._aclient is None:
+   self._aclient=AsyncClickHouse(self._dmc)
+  return self._aclient
+ def _filtering_lock(self):
+  if self._afilter_lock is None:
+   self._afilter_lock=asyncio.Lock()
+  return self._afilter_lock
+ async def _await_filtering(self):
+  async with self._filtering_lock():
+   pass
+ async def _aexe(self,sql,**kwargs):
+  try:
+   return await self.aclient.sql(sql,**kwargs)
+  except QueryTimeout:
+   raise
+  except Exception as e:
+   raise ClickHouseException('\n'.join(str(e).split('\n')[0:3]))from None
+ async def _aprefetch_filtered(self):
+  asets=[aset for aset in self.asets.values()if aset._filtered is None]
+  flags=await asyncio.gather(*[self.aclient.run(aset._is_filtered)for aset in asets])
+  for aset,flag in zip(asets,flags):
+   aset.filtered=flag
+ async def aget_items(self,dim2=None,aset_dim2=None,alias=None,projection=None,limit=None,order_by=None,excluded=None,index=None,highlight=True,caption=None):
+  await self._await_filtering()
+  await self._aprefetch_filtered()
+  hacol,obj=self._items_cql(dim2,aset_dim2,alias,projection,limit,order_by,excluded)
+  sql_query,columns,qid=obj.Query()
+  pandas_df=await self._aexe(sql_query,cols=columns,index=index,columnar=True,qid=qid,profile='interactive',timeout=self._timeout)
+  return self._style_items(hacol,pandas_df,highlight,caption,filtered=hacol.filtered)
+ async def aget_tuples(self,*dims,aset_dim2,projection=None,group_by=None,limit=None,offset=0,order_by=None,pandas_columns=None,index=None,hb2=False,hb1=False,strategy='auto'):
+  await self._await_filtering()
+  await self._aprefetch_filtered()
+  table=None
+  if strategy in['auto','rows']:
+   tables=self._tuples_tables([self._create_dms_attr(dim)for dim in dims],aset_dim2)
+   table=await self.aclient.run(self._imported_table,tables)
+  sql_query,pandas_columns=self._tuples_query(*dims,aset_dim2=aset_dim2,projection=projection,group_by=group_by,limit=limit,offset=offset,order_by=order_by,pandas_columns=pandas_columns,hb2=hb2,hb1=hb1,strategy=strategy,table=table)
+  return await self._aexe(sql_query,cols=pandas_columns,index=index,qid='SelectTuples',profile='interactive',timeout=self._timeout)
+ async def acount_items(self):
+  await self._await_filtering()
+  await self._aprefetch_filtered()
+  asets=[aset for k,aset in self._asets.items()if isinstance(k,tuple)]
+  cqls=[aset.cql.Count(coltype='set')for aset in asets]
+  dfs=await asyncio.gather(*[self._aexe(cql.Res[0],cols='ha2, cnt',index='ha2',columnar=True,qid='Counting',profile='interactive',timeout=self._timeout)for cql in cqls])
+  return[cql._count_items(dfcnt)for cql,dfcnt in zip(cqls,dfs)]
+ async def afilter_selections(self,cql_selections,mode='single'):
+  async with self._filtering_lock():
+   return await self.aclient.run(self.filter_selections,cql_selections,mode=mode)
@@ -8,7 +8,7 @@ in the parent directory that are licensed under GNU Affero General Public Licens
 You should retain this header in the file and a copy of the LICENSE_TOSLA file in the current directory
 """
 from triadb.utils import ETL
-from triadb.exceptions import HACOLError,OperationError,ClickHouseException,DataModelSystemError
+from triadb.exceptions import HACOLError,OperationError,ClickHouseException,DataModelSystemError,QueryTimeout
 from.generative import GenerativeBase,_generative
 oplist=['Counting','Sum','Average','Projection','Selection']
 out_types=['single','list','keys','tuple','dict','ids','set of items','tuple of items']
@@ -40,23 +40,20 @@ class HACOL(object):
   self._pentities=self._attrib.parents
   if not self._pentity:
    self._pentity=self._pentities[0]
-  self._filtered=self._is_filtered() 
-  self._hatoms=self.count() 
  def __repr__(self):
   filtered=''
-  if self._filtered:
+  if self.filtered:
    filtered=' <FLT>'
   return f'{self._type}{self.key}[{self._alias}]{filtered}'
  def __str__(self):
   filtered=''
-  if self._filtered:
+  if self.filtered:
    filtered=' <FILTERED>'
-  return f'{self._type}{self.key}[{self._alias}] = {self._hatoms} hatoms{filtered}'
+  return f'{self._type}{self.key}[{self._alias}] = {self.hatoms} hatoms{filtered}'
  def _is_filtered(self):
   filtered=False
-  flt_prefix=f'FLT_{self._pentity.dim3}_{self._pentity.dim2}'
-  sql_views_info=self._engine.get_table_engines(engine='View',table=f'{flt_prefix}_VW')
-  if sql_views_info is not None:
+  flt_prefix=self._engine.flt_prefix(self._pentity.dim3,self._pentity.dim2)
+  if self._engine.chsql(f'EXISTS TABLE {flt_prefix}_VW_pos',qid='ExistsVW_pos')[0][0]:
    filtered=True
   return filtered
  @property
@@ -76,7 +73,10 @@ class HACOL(object):
   return self._seldict
  @property
  def filtered(self):
-  return self._filtered
+  aset=self._engine.find_aset(self._pentity.dim3,self._pentity.dim2)
+  if aset is not None:
+   return aset.filtered
+  return self._is_filtered()
  @property
  def str(self):
   print(self)
@@ -113,7 +113,11 @@ class HACOL(object):
   return self.dim3,self.dim2
  @property
  def hatoms(self):
+  if self._hatoms is None:
+   self.count()
   return self._hatoms
+ def invalidate(self):
+  self._hatoms=None
  @property
  def last_query(self):
   if self._qid=='Over':
@@ -131,11 +135,12 @@ class HACOL(object):
   try:
    self._attrib.switch(dim3=self.dim3,dim2=dim2,alias=alias)
    self._update_instance_vars()
+   self._hatoms=None
   except DataModelSystemError:
    raise DataModelSystemError(f'Failed to switch to Attribute with ' f'dim3={self.dim3}, dim2={dim2}, alias={alias}')
   return self
  def count(self):
-  self._filtered=self._is_filtered()
+  self._filtered=self.filtered
   if self._filtered:
    self._hatoms=self.cql.Count(coltype='set',filtered=True,total=False).Exe().Value().Res
   else:
@@ -154,7 +159,7 @@ class HACQL(GenerativeBase):
   self._dim2=hacol.dim2
   self._alias=hacol.alias
   self._fltred=hacol.filtered
-  self.seldict=hacol.seldict
+  self.seldict=dict(hacol.seldict)
   self._selected=None
   self._operation='UNDEFINED'
   self._dfcolumns=None 
@@ -169,7 +174,7 @@ class HACQL(GenerativeBase):
  @_generative
  def Average(self):
   select_part=f'SELECT avg(val)'
-  from_part=f'\nFROM HAtom_{self._dim3}_{self._vtype}'
+  from_part=f'\nFROM HAtom_{self._dim3}_{self._vtype} FINAL'
   where_part=f'\nWHERE ha2={self._dim2} '
   self.Res=select_part+from_part+where_part
   self._operation='Average'
@@ -177,7 +182,7 @@ class HACQL(GenerativeBase):
  @_generative
  def Sum(self):
   select_part=f'SELECT sum(val)'
-  from_part=f'\nFROM HAtom_{self._dim3}_{self._vtype}'
+  from_part=f'\nFROM HAtom_{self._dim3}_{self._vtype} FINAL'
   where_part=f'\nWHERE ha2={self._dim2} '
   self.Res=select_part+from_part+where_part
   self._operation='Sum'
@@ -190,11 +195,11 @@ class HACQL(GenerativeBase):
   else:
    select_part=f'SELECT count(ha2)'
   if coltype=='set':
-   from_part=f'\nFROM HAtom_{self._dim3}States'
+   from_part=f'\nFROM {self._hacol._engine.states_table} FINAL'
   elif coltype=='bag':
    from_part=f'\nFROM HLink_{self._dim3}'
   elif coltype=='val':
-   from_part=f'\nFROM HAtom_{self._dim3}_{self._vtype}'
+   from_part=f'\nFROM HAtom_{self._dim3}_{self._vtype} FINAL'
   else:
    raise OperationError(f'Operation failed, check ``Count`` parameters')
   if filtered:
@@ -262,7 +267,7 @@ class HACQL(GenerativeBase):
   left_sel+='SELECT '
   left_sel+=f'{sql_columns} '
   if in_filtered_state:
-   left_frm=f'\nFROM HAtom_{self._dim3}States'
+   left_frm=f'\nFROM (SELECT * FROM {self._hacol._engine.states_table} FINAL WHERE ha2={self._dim2})'
   else:
    left_frm=f'\nFROM HAtom_{self._dim3}'
   left_sql=left_sel+left_frm
@@ -287,7 +292,7 @@ class HACQL(GenerativeBase):
  @_generative
  def Select(self):
   sel='\nSELECT arrayJoin(hb1arr) AS hb1'
-  frm=f'\nFROM HAtom_{self._dim3}_{self._vtype}'
+  frm=f'\nFROM HAtom_{self._dim3}_{self._vtype} FINAL'
   if self._hacol.is_junction:
    whe=f'\nWHERE ha2={self._dim2} AND hb2={self._hacol.pentity.dim2} '
   else:
@@ -396,26 +401,21 @@ class HACQL(GenerativeBase):
  def Display(self):
   print(self.Res)
  @_generative
- def Exe(self,columns=None,index=None,exe=True):
+ def Exe(self,columns=None,index=None,exe=True,categorical=False):
   hbsql,selsql,oversql='','',''
   if self._operation not in oplist:
    raise OperationError(f'Operation failed. Unknown operation {self._operation}')
   if self._operation=='Selection':
    hbsql=self.Res
    sel='\nSELECT hb2, hb1arr, cnt, ha2, ha1, pos, if (pos=1, 1, 0) as sel'
-   frm=f'\nFROM HAtom_{self._dim3}States'
+   frm=f'\nFROM {self._hacol._engine.states_table} FINAL'
    whe=f'\nWHERE hb2={self._hacol.pentity.dim2} and ha2={self._dim2} and ha1 IN'
    subsel='\n(SELECT ha1'
    delimiter_ndx=hbsql.find('\n',hbsql.find('\n')+1)
    rest=hbsql[delimiter_ndx:]
    selsql=sel+frm+whe+subsel+rest+')'
   elif self._operation=='Projection':
-   join_cl='\n ANY INNER JOIN \n('
-   if self._hacol.is_junction:
-    using_cl='\n) USING ha2, ha1, hb2'
-   else:
-    using_cl='\n) USING ha2, ha1'
-   oversql+=self.Res['left']+join_cl+self.Res['right']+using_cl+self.Res['exc']+self.Res['end']
+   oversql=self._over_sql()
   if columns:
    self._dfcolumns=columns
   self._hacol._columns=self._dfcolumns
@@ -430,18 +430,31 @@ class HACQL(GenerativeBase):
   try:
    if self._operation=='Selection':
     if exe:
-     self.Res=self.sql(hbsql,cols=self._dfcolumns,index=index,qid=self._operation,execute=exe)
+     self.Res=self.sql(hbsql,cols=self._dfcolumns,index=index,qid=self._operation,execute=exe,profile='interactive',timeout=self._hacol._engine.timeout)
     else:
      self.Res=(hbsql,selsql)
    elif self._operation=='Projection':
     if exe:
-     self.Res=self.sql(oversql,cols=self._dfcolumns,index=index,qid=self._operation,execute=exe)
+     self.Res=self.sql(oversql,cols=self._dfcolumns,index=index,columnar=True,categorical=categorical,qid=self._operation,execute=exe,profile='interactive',timeout=self._hacol._engine.timeout)
     else:
      self.Res=oversql
    else:
-    self.Res=self.sql(self.Res,cols=self._dfcolumns,index=index,qid=self._operation,execute=exe)
+    self.Res=self.sql(self.Res,cols=self._dfcolumns,index=index,columnar=True,categorical=categorical,qid=self._operation,execute=exe,profile='interactive',timeout=self._hacol._engine.timeout)
+  except QueryTimeout:
+   raise
   except Exception as e:
    raise ClickHouseException('\n'.join(str(e).split('\n')[0:3]))from None
+ def _over_sql(self):
+  join_cl='\n ANY INNER JOIN \n('
+  if self._hacol.is_junction:
+   using_cl='\n) USING ha2, ha1, hb2'
+  else:
+   using_cl='\n) USING ha2, ha1'
+  return self.Res['left']+join_cl+self.Res['right']+using_cl+self.Res['exc']+self.Res['end']
+ def Query(self,columns=None):
+  if self._operation!='Projection':
+   raise OperationError(f'Operation failed, Query() is defined only for Over() projections')
+  return self._over_sql(),columns or self._dfcolumns,self._operation
  @_generative
  def Value(self):
   self.Res=self.Res.values[0][0]
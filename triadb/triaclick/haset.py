@@ -12,7 +12,7 @@ You should retain this header in the file and a copy of the LICENSE_TOSLA file i
 import time
 from collections import namedtuple
 from triadb.utils import ETL
-from triadb.exceptions import ASetError, OperationError
+from triadb.exceptions import ASetError, OperationError, QueryTimeout
 from .generative import GenerativeBase, _generative
 from .hacol import HACQL, HACOL
 
@@ -25,19 +25,26 @@ class ASET(object):
         self._ent = dms_entity
         self._engine = engine
         self.chsql = self._engine.chsql
+        self.chpipe = self._engine.chpipe
         self._type = 'ASET'  # type of hyper-structure
         self._last_query = None  # last query executed
         self._columns = None  # is used for pandas dataframe columns
         self._index = None  # is used for pandas dataframe index
         self._qid = None  # SQL query id
         self._alias = self._ent.alias  # Entity alias name
-        self._flt_prefix = f'FLT_{self._ent.dim3}_{self._ent.dim2}'  # prefix for SQL tables in filtered state
-        self._hatom_states = f'HAtom_{self._ent.dim3}States'  # HAtom table name in filtered state
+        self._flt_prefix = engine.flt_prefix(self._ent.dim3, self._ent.dim2)  # prefix for SQL tables in filtered state
+        self._hatom_states = engine.states_table  # HAtom table name in filtered state
+        # names of the Memory engines with the current and the next set of hbonds,
+        # they are persisted on the Entity only for the shared (session-less) filter states
+        if engine.session:
+            self._old_set, self._new_set = f'{self._flt_prefix}_MEM_Z', f'{self._flt_prefix}_MEM_X'
+        else:
+            self._old_set, self._new_set = self._ent.old_set, self._ent.new_set
         self._attributes = self._ent.get_attributes(out='objects')
         self._attributes_keyname = {(attr.dim4, attr.dim3, attr.dim2): attr.alias for attr in self._attributes}
         self._selectops = []  # List of cql.Select() operations
-        self._filtered = self._is_filtered()
-        self._hbonds = self.count()  # is used to store the result from count()
+        self._filtered = None  # filter state is checked on first access
+        self._hbonds = None  # is used to store the result from count(), it is counted on first access
 
         class Association(self.createAssociationConstruct()):
             def __str__(self):
@@ -55,20 +62,22 @@ class ASET(object):
         return assoc
     def __repr__(self):
         filtered = ''
-        if self._filtered:
+        if self.filtered:
             filtered = ' filtered'
-        return f'{self._type}{self.key}[{self._alias}] = {self._hbonds} hbonds{filtered}'
-    def reset(self):
+        return f'{self._type}{self.key}[{self._alias}] = {self.hbonds} hbonds{filtered}'
+    def drop_states(self):
         self.chsql(f'DROP TABLE IF EXISTS {self._flt_prefix}_VW_pos', qid='Drop VW_pos')
         self.chsql(f'DROP TABLE IF EXISTS {self._flt_prefix}_VW_sel', qid='Drop VW_sel')
         self.chsql(f'DROP TABLE IF EXISTS {self._flt_prefix}_MEM_X', qid='Drop MEM_X')
         self.chsql(f'DROP TABLE IF EXISTS {self._flt_prefix}_MEM_Z', qid='Drop MEM_Z')
         self.chsql(f'DROP TABLE IF EXISTS {self._flt_prefix}_MEM_ha1', qid='Drop MEM_ha1')
-        self._ent.old_set = f'{self._flt_prefix}_MEM_Z'
-        self._ent.new_set = f'{self._flt_prefix}_MEM_X'
+    def reset(self):
+        self.drop_states()
+        self.old_set = f'{self._flt_prefix}_MEM_Z'
+        self.new_set = f'{self._flt_prefix}_MEM_X'
         self._selectops = []
         self._filtered = False
-        self._hbonds = self.count()
+        self._hbonds = None
         return self._filtered
     @property
     def selectops(self):
@@ -77,6 +86,22 @@ class ASET(object):
     def flt_prefix(self):
         return self._flt_prefix
     @property
+    def old_set(self):
+        return self._old_set
+    @old_set.setter
+    def old_set(self, name):
+        self._old_set = name
+        if not self._engine.session:
+            self._ent.old_set = name
+    @property
+    def new_set(self):
+        return self._new_set
+    @new_set.setter
+    def new_set(self, name):
+        self._new_set = name
+        if not self._engine.session:
+            self._ent.new_set = name
+    @property
     def hatom_states(self):
         return self._hatom_states
     @property
@@ -114,12 +139,16 @@ class ASET(object):
         return self._ent.key[0], self._ent.key[1]
     @property
     def filtered(self):
+        if self._filtered is None:
+            self._filtered = self._is_filtered()
         return self._filtered
     @filtered.setter
     def filtered(self, status):
         self._filtered = status
     @property
     def hbonds(self):
+        if self._hbonds is None:
+            self._hbonds = self.count()
         return self._hbonds
     @hbonds.setter
     def hbonds(self, cnt):
@@ -144,17 +173,14 @@ class ASET(object):
         return ASETCQL(self)
     def _is_filtered(self):
         filtered = False
-        sql_views_info = self._engine.get_table_engines(engine='View', table=f'{self._flt_prefix}_VW')
-        if sql_views_info is not None:
+        # exact name of the view, a LIKE pattern matches the views of other sessions too
+        if self.chsql(f'EXISTS TABLE {self._flt_prefix}_VW_pos', qid='ExistsVW_pos')[0][0]:
             filtered = True
         return filtered
-    def clear_states_engine_columns(self, columns, exe=True):
-        part_ids = self._engine.get_parts(alias='hatomStates', hb2=f'{self._ent.dim2}').index.values
-        for col in columns:
-            for prtid in part_ids:
-                self.chsql(f'''ALTER TABLE {self._hatom_states} CLEAR COLUMN {col} in PARTITION ID '{prtid}' ''',
-                           qid='Clear Column in Partition ID', execute=exe)
-        return part_ids
+    def reset_states(self, exe=True):
+        plan = self._engine._reset_states_plan(self._ent.dim2)
+        self.chpipe(plan, execute=exe, profile='filter')
+        return [qid for _, qid, _ in plan]
     def count(self, coltype='val', projection=None, missing=False, order='cnt', estimate=True):
         if coltype == 'val':
             result = self.cql.Count(coltype=coltype, projection=projection,
@@ -229,6 +255,7 @@ class ASETCQL(GenerativeBase):
         self.Res = result
         self._aset = aset
         self._sql = aset.chsql
+        self._pipeline = aset.chpipe
         self._dbg = aset.dbg
         self._key = aset.key
         self._dim3 = aset.key[0]
@@ -249,7 +276,7 @@ class ASETCQL(GenerativeBase):
             count_label = 'Distinct Items (domain values)'
             if self._aset.filtered:
                 sel = f'SELECT ha2, count(ha2) AS cnt'
-                frm = f'\nFROM {self._hatom_states}'
+                frm = f'\nFROM {self._hatom_states} FINAL'
                 whe = f'\nWHERE hb2={self._dim2} AND pos=1'
                 grp = '\nGROUP BY ha2'
             else:
@@ -266,7 +293,7 @@ class ASETCQL(GenerativeBase):
             if self._aset.filtered:
                 sel = f'SELECT ha2, count(ha2) as cnt'
                 frm = f'\nFROM HLink_{self._dim3}'
-                whe = f'\nWHERE hb2={self._dim2} AND hb1 IN {self._aset.ent.old_set}'
+                whe = f'\nWHERE hb2={self._dim2} AND hb1 IN {self._aset.old_set}'
                 grp = '\nGROUP BY ha2'
             else:
                 sel = f'SELECT ha2, count(ha2) as cnt'
@@ -276,7 +303,7 @@ class ASETCQL(GenerativeBase):
         elif coltype == 'val':
             if self._aset.filtered:
                 sel = f'SELECT count()'
-                frm = f'\nFROM {self._aset.ent.old_set}'
+                frm = f'\nFROM {self._aset.old_set}'
             else:
                 if estimate:
                     sel = f'SELECT uniq(hb1)'
@@ -335,32 +362,38 @@ class ASETCQL(GenerativeBase):
         if mode == 'single':
             hbsql, selsql = self._aset.selectops[-1].Exe(exe=False).Res
             if self._aset.filtered:
-                hbset_subquery = hbsql + 'AND hb1 IN ' + f'{self._aset.ent.old_set}'
+                hbset_subquery = hbsql + 'AND hb1 IN ' + f'{self._aset.old_set}'
             else:
                 hbset_subquery = hbsql
         self.Res = {'update_pos': hbset_subquery, 'update_sel': sel_query}
         self._operation = 'Filtering'
 
     def _filtering(self, hbset_subquery, sel_query):
+        """
+        :return: filter plan, i.e. two lists of (sql statement, query id, query ids it depends on)
+        statements run on a pipeline, a statement starts when all the statements it depends on are completed
+        HAtom_States is never merged here, the latest state of an hatom is read with FINAL over its partitions
+        """
         updpos = []
         if self._aset.filtered:
-            if self._aset.ent.new_set == f'{self._flt_prefix}_MEM_Z':
+            if self._aset.new_set == f'{self._flt_prefix}_MEM_Z':
                 updpos.append((f'DROP TABLE IF EXISTS {self._flt_prefix}_MEM_Z',
-                               'Drop MEM_Z memory engine'))
-                updpos.append((f'CREATE TABLE {self._aset.ent.new_set} ( hbz UInt32 ) ENGINE = Memory',
-                               f'Create MEM_Z memory engine'))
+                               'Drop MEM_Z memory engine', ()))
+                updpos.append((f'CREATE TABLE {self._aset.new_set} ( hbz UInt32 ) ENGINE = Memory',
+                               f'Create MEM_Z memory engine', ('Drop MEM_Z memory engine', )))
             else:
                 updpos.append((f'DROP TABLE IF EXISTS {self._flt_prefix}_MEM_X',
-                               'Drop MEM_X memory engine'))
-                updpos.append((f'CREATE TABLE {self._aset.ent.new_set} ( hbx UInt32 ) ENGINE = Memory',
-                               f'Create MEM_X memory engine'))
+                               'Drop MEM_X memory engine', ()))
+                updpos.append((f'CREATE TABLE {self._aset.new_set} ( hbx UInt32 ) ENGINE = Memory',
+                               f'Create MEM_X memory engine', ('Drop MEM_X memory engine', )))
         else:
             updpos.append((f'CREATE TABLE {self._flt_prefix}_MEM_X ( hbx UInt32 ) ENGINE = Memory',
-                           'Create MEM_X memory engine'))
-        updpos.append((f'INSERT INTO {self._aset.ent.new_set} {hbset_subquery}',
-                       'Insert filtered HBonds'))
+                           'Create MEM_X memory engine', ()))
+        create_mem = updpos[-1][1]
+        updpos.append((f'INSERT INTO {self._aset.new_set} {hbset_subquery}',
+                       'Insert filtered HBonds', (create_mem, )))
         updpos.append((f'\nDROP TABLE IF EXISTS {self._flt_prefix}_VW_pos',
-                       'Drop VW_pos'))
+                       'Drop VW_pos', ()))
         updpos.append((f'''
 CREATE VIEW {self._flt_prefix}_VW_pos AS
 SELECT any(hb2) AS hb2, groupArray(hb1) AS hb1arr, count() AS cnt, ha2, ha1, 1 AS pos, 0 AS sel  
@@ -368,36 +401,53 @@ FROM
 (
 SELECT *
 FROM HLink_{self._dim3}
-WHERE hb2={self._dim2} AND hb1 IN {self._aset.ent.new_set})
+WHERE hb2={self._dim2} AND hb1 IN {self._aset.new_set})
 GROUP BY ha2, ha1
 ORDER BY ha2, ha1
 ''',
-                       'Create VW_pos'))
-        updpos.append((f'INSERT INTO {self._hatom_states}\nSELECT * FROM {self._flt_prefix}_VW_pos',
-                       'Insert VW_pos into HAtom_States'))
-        updpos.append((f'\nOPTIMIZE TABLE {self._hatom_states} FINAL',
-                       'Optimize HAtom_States'))
+                       'Create VW_pos', ('Drop VW_pos', create_mem)))
+        updpos.append((f'INSERT INTO {self._hatom_states} (hb2, hb1arr, cnt, ha2, ha1, pos, sel)\nSELECT * FROM {self._flt_prefix}_VW_pos',
+                       'Insert VW_pos into HAtom_States', ('Insert filtered HBonds', 'Create VW_pos')))
         updsel = []
         if sel_query:
+            # VW_sel is (re)created beside the update of pos, it is read after pos has been updated
             updsel.append((f'\nDROP TABLE IF EXISTS {self._flt_prefix}_VW_sel',
-                           'Drop VW_sel'))
+                           'Drop VW_sel', ()))
             updsel.append((f'\nCREATE VIEW {self._flt_prefix}_VW_sel AS {sel_query}',
-                           'Create VW_sel'))
-            updsel.append((f'\nINSERT INTO {self._hatom_states}\nSELECT * FROM {self._flt_prefix}_VW_sel',
-                           'Insert VW_sel into HAtom_States'))
-            updsel.append((f'\nOPTIMIZE TABLE {self._hatom_states} FINAL',
-                           'Optimize HAtom_States'))
-        else:
-            updsel.append((f'\nSELECT 1', 'Dummy SQL statement'))
+                           'Create VW_sel', ('Drop VW_sel', )))
+            updsel.append((f'\nINSERT INTO {self._hatom_states} (hb2, hb1arr, cnt, ha2, ha1, pos, sel)\nSELECT * FROM {self._flt_prefix}_VW_sel',
+                           'Insert VW_sel into HAtom_States', ('Create VW_sel', 'Insert VW_pos into HAtom_States')))
 
         return updpos, updsel
 
+    def _count_items(self, dfcnt):
+        """
+        :param dfcnt: pandas dataframe with the result of the Counting query, i.e. cnt column indexed by ha2
+        :return: pandas dataframe with the number of items of each attribute collection
+        """
+        (cnt_query, attribs, new_dfcolumns, cntlbl, missing, order) = self.Res
+        cnt_items_dict = dfcnt['cnt'].to_dict() if dfcnt is not None else {}
+        if missing:
+            attr_items_dict = {obj.key: [obj.alias, (self._aset.hbonds - cnt_items_dict.get(obj.dim2, 0))]
+                               for obj in attribs}
+        else:
+            attr_items_dict = {obj.key: [obj.alias, cnt_items_dict.get(obj.dim2, 0)] for obj in attribs}
+        df_items_count = ETL.dict_to_dataframe(attr_items_dict, new_dfcolumns)
+        if order == 'key':
+            df_items_count = df_items_count.sort_index()
+        elif order == 'col':
+            df_items_count = df_items_count.sort_values(by='Attribute Collection', ascending=True)
+        elif order == 'cnt':
+            df_items_count = df_items_count.sort_values(by=cntlbl, ascending=False)
+        return df_items_count
+
     @_generative
-    def Exe(self, columns=None, index=None, exe=True):
+    def Exe(self, columns=None, index=None, exe=True, categorical=False):
         """
         :param columns: pandas dataframe columns
         :param index: pandas index
         :param exe: if true execute the sql query
+        :param categorical: convert String columns of the result to pandas categorical dtype
         :return: result is returned with the self.Res
         This method executes the query constructed from previous generative calls
         it also modifies certain instance variables of ASET object
@@ -418,40 +468,35 @@ ORDER BY ha2, ha1
         try:
             if self._operation == 'Filtering':
                 t_start = time.time()
-                self._aset.clear_states_engine_columns(['hb1arr', 'cnt', 'pos', 'sel'], exe=exe)
-                for update_of_state in self.Res:
-                    for sql_statement, query_id in update_of_state:
-                        self._sql(sql_statement, qid=query_id, execute=exe)
-                    if self._dbg > 1:
-                        print('▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄')
+                self._aset.reset_states(exe=exe)
+                updpos, updsel = self.Res
+                timings = self._pipeline(updpos + updsel, execute=exe, profile='filter')
+                if self._dbg > 1:
+                    for query_id, elapsed in timings.items():
+                        print(f'{query_id}: {round(elapsed, 3)} sec')
+                    print('▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄▄')
                 t_stop = time.time()
                 if self._dbg > 1:
                     print(f'Filtering of ASET({self._aset.key})[{self._aset.alias}] is completed:')
                     print(f'Elapsed: {round(t_stop-t_start, 3)} sec')
                 if exe:
-                    self._aset.ent.old_set, self._aset.ent.new_set = self._aset.ent.new_set, self._aset.ent.old_set
+                    self._aset.old_set, self._aset.new_set = self._aset.new_set, self._aset.old_set
+                    self._aset._engine.bump_epoch()
                     self._aset.filtered = True
-                    self._aset.hbonds = self._sql(f'SELECT count() FROM {self._aset.ent.old_set}',
+                    self._aset.hbonds = self._sql(f'SELECT count() FROM {self._aset.old_set}',
                                                   qid='Counting').values[0][0]
             elif self._operation == 'Counting' and self._dfcolumns != 'HyperBonds':
-                (cnt_query, attribs, new_dfcolumns, cntlbl, missing, order) = self.Res
-                dfcnt = self._sql(cnt_query, cols='ha2, cnt', index='ha2', qid=self._operation, execute=exe)
-                cnt_items_dict = dfcnt['cnt'].to_dict()
-                if missing:
-                    attr_items_dict = {obj.key: [obj.alias, (self._aset.hbonds - cnt_items_dict.get(obj.dim2, 0))]
-                                       for obj in attribs}
-                else:
-                    attr_items_dict = {obj.key: [obj.alias, cnt_items_dict.get(obj.dim2, 0)] for obj in attribs}
-                df_items_count = ETL.dict_to_dataframe(attr_items_dict, new_dfcolumns)
-                if order == 'key':
-                    self.Res = df_items_count.sort_index()
-                elif order == 'col':
-                    self.Res = df_items_count.sort_values(by='Attribute Collection', ascending=True)
-                elif order == 'cnt':
-                    self.Res = df_items_count.sort_values(by=cntlbl, ascending=False)
+                dfcnt = self._sql(self.Res[0], cols='ha2, cnt', index='ha2', columnar=True,
+                                  qid=self._operation, execute=exe, profile='interactive',
+                                  timeout=self._aset._engine.timeout)
+                self.Res = self._count_items(dfcnt)
             else:
-                self.Res = self._sql(self.Res, cols=self._dfcolumns, index=index, qid=self._operation, execute=exe)
+                self.Res = self._sql(self.Res, cols=self._dfcolumns, index=index, columnar=True,
+                                     categorical=categorical, qid=self._operation, execute=exe,
+                                     profile='interactive', timeout=self._aset._engine.timeout)
 
+        except QueryTimeout:
+            raise
         except Exception as e:
             raise print(e)
 
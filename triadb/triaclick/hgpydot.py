@@ -0,0 +1,54 @@
+"""
+This file is part of TriaClick Associative Semiotic Hypergraph Engine
+(C) 2018-2019 Athanassios I. Hatzis
+Licensed under the TriaClick Open Source License Agreement (TOSLA)
+You may not use this file except in compliance with TOSLA.
+The files subject to TOSLA are grouped in this directory to clearly separate them from files
+in the parent directory that are licensed under GNU Affero General Public License v.3.0.
+You should retain this header in the file and a copy of the LICENSE_TOSLA file in the current directory
+"""
+from pydot import Graph,Cluster,Node,Edge
+from graphviz import Source as GVSource
+class HGPyDot(Graph):
+ def __init__(self,**kwargs):
+  super().__init__(**kwargs)
+ @classmethod
+ def pydot_bipartite(cls,gseperation=0.2,nseperation=0.6,left_label='Left Set',right_label='Right Set',left_ncolor='green',right_ncolor='brown1',left_nodes=None,right_nodes=None,left_nlabels=None,right_nlabels=None):
+  pydot_graph=cls(graph_type='digraph')
+  pydot_graph.set_layout('dot')
+  pydot_graph.set_splines('false')
+  pydot_graph.set_rankdir('TB')
+  pydot_graph.set_ranksep(gseperation)
+  pydot_graph.set_nodesep(nseperation)
+  cluster_left=cls.bipartite_cluster('Left',left_label,left_nodes,left_nlabels,left_ncolor)
+  pydot_graph.add_subgraph(cluster_left)
+  cluster_right=cls.bipartite_cluster('Right',right_label,right_nodes,right_nlabels,right_ncolor)
+  pydot_graph.add_subgraph(cluster_right)
+  return pydot_graph
+ @classmethod
+ def bipartite_cluster(cls,cluster_name,cluster_label,cluster_nodes,cluster_nlabels,node_color):
+  cluster=Cluster(cluster_name)
+  cluster.set_label(cluster_label)
+  cluster.set_fillcolor('lightgrey')
+  cluster.set_style('filled')
+  cluster.set_rank('same')
+  for n,label in zip(cluster_nodes,cluster_nlabels):
+   cluster.add_node(cls.bipartite_node(n,label,node_color))
+  for first,second in zip(cluster_nodes,cluster_nodes[1:]):
+   cluster.add_edge(cls.bipartite_edge(first,second))
+  return cluster
+ @classmethod
+ def bipartite_node(cls,node_name,node_label,node_color):
+  node=Node(node_name,label=node_label,fillcolor=node_color,style='filled',penwidth=2,width=0.3,shape='oval',fontsize=11)
+  return node
+ @classmethod
+ def bipartite_edge(cls,begin,end):
+  edge=Edge(begin,end)
+  return edge
+ def bipartite_mapping(self,pairs):
+  self.set_edge_defaults(constraint='false')
+  for left,right in pairs:
+   self.add_edge(self.bipartite_edge(left,right))
+  return self
+ def draw(self,output_format=None,output_dir=None,output_filename=None):
+  return GVSource(self.to_string(),format=output_format,directory=output_dir,filename=output_filename)
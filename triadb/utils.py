@@ -17,16 +17,16 @@ If not, see <https://www.gnu.org/licenses/>.
 # Package-Modules Dependencies
 # ===================================================================
 from time import gmtime, strftime
-from IPython.display import display_html
 import pandas as pd
 import os.path
-import tkinter as tk
 import json
-import petl
-import psutil
 
 from operator import itemgetter
-from tkinter import filedialog
+
+from .exceptions import PandasError
+
+# Notice: IPython, tkinter, psutil and petl are imported on first use,
+# so that `import triadb` does not load notebook, GUI and monitoring packages in headless services
 
 # Global variables and settings
 
@@ -34,13 +34,26 @@ pd.set_option('display.max_columns', 500)
 pd.set_option('display.max_rows', 500)
 pd.set_option('display.width', 1000)
 pd.set_option('display.max_colwidth', 300)
-petl.config.look_style = 'simple'
 
-# If sort_buffersize is set to None, this forces all sorting to be done entirely in memory.
-petl.config.sort_buffersize = None
+_petl = None
+
+
+def get_petl():
+    """
+    :return: petl module, it is imported and configured the first time it is used
+    """
+    global _petl
+    if _petl is None:
+        import petl
+        petl.config.look_style = 'simple'
+        # If sort_buffersize is set to None, this forces all sorting to be done entirely in memory.
+        petl.config.sort_buffersize = None
+        _petl = petl
+    return _petl
 
 
 def display_dataframes(*df_stylers):
+    from IPython.display import display_html
     html_repr = ''
     for styler in df_stylers:
         html_repr += styler.render() + "\xa0\xa0\xa0"
@@ -79,6 +92,7 @@ def sql_construct(select, frm, where=None, group_by=None, having=None, order=Non
 class MemStats(object):
 
     def __init__(self):
+        import psutil
         self._mem = psutil.virtual_memory()
         self._cpu = psutil.cpu_percent()
 
@@ -182,6 +196,8 @@ class ETL(object):
     @staticmethod
     def get_filenames(path, extension='json', window_title='Choose files', gui=False, select=None):
         if gui:
+            import tkinter as tk
+            from tkinter import filedialog
             root = tk.Tk()
             root.withdraw()
             root.call('wm', 'attributes', '.', '-topmost', True)
@@ -226,6 +242,7 @@ class ETL(object):
         if not ftype.lower() == ext:
             raise Exception(f'Failed: Filename extension does not match < ftype={ftype} >')
 
+        petl = get_petl()
         if ftype == 'CSV':
             return petl.fromcsv(fname).head(0).tol()[0]
         elif ftype == 'TSV':
@@ -256,6 +273,7 @@ class ETL(object):
         # Get the extension of the filename
         table = None
         if source:
+            petl = get_petl()
             ext = os.path.splitext(source)[1]
 
             # Read all rows from the file and create a pandas dataframe in memory
@@ -284,6 +302,56 @@ class ETL(object):
 
         return table
 
+    @staticmethod
+    def get_rows(data, fields=None, types=None, block_size=65536):
+        """
+        Iterate over the rows of tabular data, they are sent to ClickHouse with the native protocol
+        :param data: pandas dataframe, petl table or numpy array (structured or 2-D)
+        :param fields: selected fields (columns) of data, by default all of them in data order
+        :param types: ClickHouse column types by field, NaN/NaT become None in Nullable columns
+                      and timestamps become date or datetime objects in Date and DateTime columns
+        :param block_size: number of rows that are converted to python objects together
+        :return: generator of row tuples
+        """
+        types = types or {}
+        if isinstance(data, pd.DataFrame) or (hasattr(data, 'dtype') and hasattr(data, 'shape')):
+            if isinstance(data, pd.DataFrame):
+                names = fields or list(data.columns)
+                columns = [data[fld] for fld in names]
+            elif data.dtype.names:
+                names = fields or list(data.dtype.names)
+                columns = [data[fld] for fld in names]
+            else:
+                columns = list(data.reshape(len(data), -1).T)
+                names = fields or [None] * len(columns)
+            for start in range(0, len(data), block_size):
+                yield from zip(*[ETL._column_values(col[start:start+block_size], types.get(name))
+                                 for name, col in zip(names, columns)])
+        else:
+            petl = get_petl()
+            table = petl.cut(data, *fields) if fields else data
+            for row in petl.data(table):
+                yield tuple(row)
+
+    @staticmethod
+    def _column_values(values, ctype=None):
+        """
+        :param values: pandas series or numpy array with the values of a column
+        :param ctype: ClickHouse type of the column, e.g. Nullable(Date)
+        :return: list of python objects
+        """
+        col = values if isinstance(values, pd.Series) else pd.Series(values)
+        base = ctype[len('Nullable('):-1] if ctype and ctype.startswith('Nullable(') else ctype
+        if base == 'Date' or (base and base.startswith('DateTime')):
+            col = pd.to_datetime(col)
+            if base == 'Date':
+                return [None if pd.isnull(v) else v.date() for v in col]
+            return [None if pd.isnull(v) else v.to_pydatetime() for v in col]
+        if col.isnull().any():
+            # tolist() converts numpy values to python objects in C, NaN are replaced with None afterwards
+            return col.astype(object).where(col.notnull(), None).tolist()
+        return col.tolist()
+
     # ===============================================================================
     # pandas dataframe methods
     # ===============================================================================
@@ -388,6 +456,31 @@ class ETL(object):
             df.set_index(ndx, inplace=True)
         return df
 
+    @staticmethod
+    def get_columnar_dataframe(arrays, columns, ndx=None, categorical=None):
+        """
+        Construct pandas dataframe directly from column arrays, without creating python row tuples
+        :param arrays: list like object, one sequence of values for each column
+        :param columns: labels to use for the columns of the resulting frame
+        :param ndx: index to use for resulting frame
+        :param categorical: labels of the columns that will be converted to pandas categorical dtype
+        :return: pandas dataframe
+        """
+        if not arrays:
+            df = pd.DataFrame(columns=columns)
+            if ndx:
+                df.set_index(ndx, inplace=True)
+            return df
+        if len(columns) != len(arrays):
+            raise PandasError(f'Failed to construct dataframe, {len(columns)} columns for {len(arrays)} column arrays')
+        df = pd.DataFrame(dict(zip(columns, arrays)), columns=columns)
+        if categorical:
+            for col in categorical:
+                df[col] = df[col].astype('category')
+        if ndx:
+            df.set_index(ndx, inplace=True)
+        return df
+
     @staticmethod
     def get_empty_dataframe():
         return pd.DataFrame()